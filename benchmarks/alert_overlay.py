@@ -0,0 +1,112 @@
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtWidgets import QApplication, QLabel
+from PyQt5.QtWebEngineWidgets import QWebEngineView
+
+from modules.alerts import AlertPresenter
+
+# UI-thread time spent on the alert overlay, old behaviour against the presenter:
+#   python -m benchmarks.alert_overlay [--seconds 10] [--burst 5]
+# A simulated session runs 100 ms render ticks; every second a burst of
+# violation messages arrives. Only the time spent in overlay calls (show,
+# raise_, runJavaScript) is counted.
+#   legacy:    raise_() on both windows every tick, and per message show(),
+#              raise_() and a displayAlert() call that rebuilds the alert node
+#   presenter: AlertPresenter.post() per message and tick() per tick
+
+PAGE = """
+<!DOCTYPE html>
+<html><body>
+<div id="violation-alert" hidden></div>
+<script>
+    const alertDiv = document.getElementById('violation-alert');
+    let hideTimer = null;
+    function setAlert(message) {
+        alertDiv.textContent = message;
+        alertDiv.hidden = false;
+        clearTimeout(hideTimer);
+        hideTimer = setTimeout(() => { alertDiv.hidden = true; }, 10000);
+    }
+    function displayAlert(message) {
+        const existing = document.getElementById('violation-alert');
+        if (existing) { existing.remove(); }
+        const div = document.createElement('div');
+        div.id = 'violation-alert';
+        div.innerHTML = message;
+        document.body.appendChild(div);
+        setTimeout(() => { div.remove(); }, 10000);
+    }
+</script>
+</body></html>
+"""
+
+
+def make_views():
+    window = QLabel("monitor")
+    window.show()
+    alert_view = QWebEngineView()
+    alert_view.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint)
+    alert_view.setHtml(PAGE, QUrl("file://"))
+    alert_view.hide()
+    return window, alert_view
+
+
+def run(app, mode, seconds, burst):
+    window, alert_view = make_views()
+    app.processEvents()
+    spent = 0.0
+
+    def timed(fn):
+        nonlocal spent
+        start = time.perf_counter()
+        fn()
+        spent += time.perf_counter() - start
+
+    def restack():
+        window.raise_()
+        alert_view.raise_()
+
+    presenter = AlertPresenter(lambda script: alert_view.page().runJavaScript(script), alert_view.show, restack)
+    ticks = int(seconds * 10)
+    for tick in range(ticks):
+        if tick % 10 == 0:
+            for i in range(burst):
+                message = f"Abnormal Movement Detected: book (Confidence: 0.{60 + i})"
+                if mode == "legacy":
+                    def alert(message=message):
+                        alert_view.show()
+                        alert_view.page().runJavaScript(f'displayAlert("{message}");')
+                        alert_view.raise_()
+                    timed(alert)
+                else:
+                    timed(lambda message=message: presenter.post(message))
+        if mode == "legacy":
+            timed(restack)
+        else:
+            timed(presenter.tick)
+        # Let Qt deliver the queued work, as the event loop would between ticks
+        app.processEvents()
+        time.sleep(0.1)
+    alert_view.close()
+    window.close()
+    app.processEvents()
+    return spent, ticks, presenter.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--burst", type=int, default=5, help="Messages per burst (one burst per second)")
+    args = parser.parse_args()
+
+    app = QApplication([])
+    print(f"{'mode':<10} {'overlay ms':>11} {'ms/tick':>8}  updates")
+    for mode in ("legacy", "presenter"):
+        spent, ticks, stats = run(app, mode, args.seconds, args.burst)
+        updates = args.burst * int(args.seconds) if mode == "legacy" else stats["updates"]
+        print(f"{mode:<10} {spent * 1000:11.1f} {spent * 1000 / ticks:8.3f}  {updates}")
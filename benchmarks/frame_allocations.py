@@ -0,0 +1,73 @@
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from modules.frame import Frame, DisplayBuffer
+from modules.object_backends import load_calibration_frames
+
+# Per-frame memory allocated by the frame path before and after the shared Frame:
+#   python -m benchmarks.frame_allocations [--frames session.mp4] [--size 640x480]
+# Only colour conversion, preview resize and overlay drawing are measured (no
+# models), since those are the copies the shared Frame removes. NumPy and OpenCV
+# array allocations are visible to tracemalloc.
+
+
+def legacy_path(frame):
+    # As before: every consumer converts/copies the frame itself
+    obj_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)    # ObjectDetector.process_image
+    face_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)   # FaceDetector.detect_faces
+    display = cv2.resize(frame, (280, 180))              # update_frame
+    display = cv2.cvtColor(display, cv2.COLOR_BGR2RGB)
+    cv2.rectangle(display, (10, 10), (60, 60), (255, 0, 0), 2)
+    return obj_rgb, face_rgb, display
+
+
+def shared_path(frame, display_buffer):
+    shared = Frame(frame)
+    obj_rgb = shared.rgb    # Converted once...
+    face_rgb = shared.rgb   # ...and shared as a read-only view
+    display_buffer.render(shared)
+    cv2.rectangle(display_buffer.buffer, (10, 10), (60, 60), (255, 0, 0), 2)
+    return obj_rgb, face_rgb, display_buffer.buffer
+
+
+def measure(fn, frames):
+    # Peak bytes allocated while processing each frame, relative to the memory
+    # already live before it started
+    peaks = []
+    for frame in frames:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    return np.array(peaks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", help="Directory of images or a recorded video (default: synthetic frames)")
+    parser.add_argument("--size", default="160x120", help="Synthetic frame size, WIDTHxHEIGHT")
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = load_calibration_frames(args.frames, args.count)
+    else:
+        w, h = (int(v) for v in args.size.split("x"))
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for _ in range(args.count)]
+
+    display_buffer = DisplayBuffer(280, 180)
+    tracemalloc.start()
+    legacy = measure(legacy_path, frames)
+    shared = measure(lambda frame: shared_path(frame, display_buffer), frames)
+    tracemalloc.stop()
+
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames of {w}x{h}")
+    print(f"legacy path: {legacy.mean():10.0f} bytes allocated per frame")
+    print(f"shared path: {shared.mean():10.0f} bytes allocated per frame "
+          f"({100 * (1 - shared.mean() / legacy.mean()):.0f}% less)")
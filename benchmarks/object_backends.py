@@ -0,0 +1,84 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from modules.object_backends import TorchBackend, OnnxBackend, load_calibration_frames
+
+# Compares ObjectDetector backends on recorded frames:
+#   python -m benchmarks.object_backends --frames session.mp4 --onnx models/best.onnx --int8 models/best-int8.onnx
+# Latency is per frame (batch of one, as in the monitoring window). Accuracy is
+# measured against the PyTorch detections as reference: a detection matches when
+# it has the same class and IoU >= 0.5.
+
+
+def box_iou(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-7)
+
+
+def match(reference, candidate, iou_thres=0.5):
+    if not len(reference) or not len(candidate):
+        return 0
+    iou = box_iou(reference[:, :4], candidate[:, :4])
+    iou[reference[:, None, 5] != candidate[None, :, 5]] = 0
+    matched = 0
+    while iou.size and iou.max() >= iou_thres:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        matched += 1
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return matched
+
+
+def run(backend, images, warmup=5):
+    for img in images[:warmup]:
+        backend.predict([img])
+    latencies, preds = [], []
+    for img in images:
+        start = time.perf_counter()
+        preds.append(backend.predict([img])[0])
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, preds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", required=True, help="Directory of images or a recorded video")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--weights", default=r"models\best.pt")
+    parser.add_argument("--onnx", help="FP32 ONNX export")
+    parser.add_argument("--int8", help="INT8 quantized ONNX export")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--conf", type=float, default=0.2)
+    parser.add_argument("--iou", type=float, default=0.45)
+    args = parser.parse_args()
+
+    images = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in load_calibration_frames(args.frames, args.limit)]
+    backends = [("torch", TorchBackend(args.weights, args.conf, args.iou))]
+    if args.onnx:
+        backends.append(("onnx-fp32", OnnxBackend(args.onnx, args.conf, args.iou, num_threads=args.threads)))
+    if args.int8:
+        backends.append(("onnx-int8", OnnxBackend(args.int8, args.conf, args.iou, num_threads=args.threads)))
+
+    reference = None
+    print(f"{len(images)} frames")
+    print(f"{'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'recall':>7} {'precision':>9}")
+    for name, backend in backends:
+        latencies, preds = run(backend, images)
+        if reference is None:
+            reference = preds
+        matched = sum(match(r, p) for r, p in zip(reference, preds))
+        ref_total = sum(len(r) for r in reference)
+        cand_total = sum(len(p) for p in preds)
+        recall = matched / ref_total if ref_total else 1.0
+        precision = matched / cand_total if cand_total else 1.0
+        print(f"{name:<10} {np.percentile(latencies, 50):8.1f} {np.percentile(latencies, 95):8.1f} "
+              f"{latencies.mean():8.1f} {recall:7.3f} {precision:9.3f}")
@@ -0,0 +1,102 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from modules.face_detection import FaceDetector
+from modules.object_backends import load_calibration_frames
+from modules.object_detection import ObjectDetector
+from modules.roi import desk_region, largest_face
+
+# Accuracy/cost of ROI inference against the old 160x120 capture:
+#   python -m benchmarks.roi_inference session.mp4 [--backend onnx] [--faces haar]
+# The recording should be at the new native resolution (e.g. 640x480). Object
+# detections on the full native frame serve as the reference; each path is
+# scored by recall/precision against it (same class, IoU >= 0.5) and by the
+# time spent in face + object inference per frame.
+#   baseline: frame downscaled to 160x120, faces and objects on the whole frame
+#   roi:      faces on a 320 px wide copy, objects on the desk region crop
+
+
+def iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-7)
+
+
+def match(reference, detections, iou_thres=0.5):
+    # Number of reference boxes found by `detections` (greedy, per class)
+    if not len(reference) or not len(detections):
+        return 0
+    ious = iou_matrix(reference[:, :4], detections[:, :4])
+    ious[reference[:, 5][:, None] != detections[:, 5][None, :]] = 0
+    found = 0
+    while ious.size and ious.max() >= iou_thres:
+        i, j = np.unravel_index(ious.argmax(), ious.shape)
+        found += 1
+        ious[i, :] = 0
+        ious[:, j] = 0
+    return found
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("frames", help="Directory of images or a recorded video at native resolution")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--faces", default="mtcnn", choices=["mtcnn", "yunet", "haar"])
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+
+    frames = load_calibration_frames(args.frames, args.count)
+    objects = ObjectDetector(backend=args.backend)
+    full_faces = FaceDetector(backend=args.faces)
+    roi_faces = FaceDetector(backend=args.faces, input_width=320)
+
+    totals = {name: {"found": 0, "detected": 0, "seconds": 0.0} for name in ("baseline", "roi")}
+    reference_total = 0
+    crop_fraction = []
+    for frame in frames:
+        h, w = frame.shape[:2]
+        reference = objects.detect(frame)
+        reference_total += len(reference)
+
+        small = cv2.resize(frame, (160, 120))
+        _, face_time = timed(lambda: full_faces.detect_raw(small))
+        detections, object_time = timed(lambda: objects.detect(small))
+        detections = detections.copy()
+        detections[:, [0, 2]] *= w / 160
+        detections[:, [1, 3]] *= h / 120
+        stats = totals["baseline"]
+        stats["found"] += match(reference, detections)
+        stats["detected"] += len(detections)
+        stats["seconds"] += face_time + object_time
+
+        faces, face_time = timed(lambda: roi_faces.detect_raw(frame))
+        roi = desk_region(largest_face(faces), frame.shape)
+        detections, object_time = timed(lambda: objects.detect(frame, roi=roi))
+        crop_fraction.append(1.0 if roi is None else (roi[2] - roi[0]) * (roi[3] - roi[1]) / (w * h))
+        stats = totals["roi"]
+        stats["found"] += match(reference, detections)
+        stats["detected"] += len(detections)
+        stats["seconds"] += face_time + object_time
+
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames of {w}x{h}, {reference_total} reference detections, "
+          f"ROI covers {100 * np.mean(crop_fraction):.0f}% of the frame on average")
+    print(f"{'path':<9} {'recall':>7} {'precision':>10} {'ms/frame':>9}")
+    for name, stats in totals.items():
+        recall = stats["found"] / reference_total if reference_total else float("nan")
+        precision = stats["found"] / stats["detected"] if stats["detected"] else float("nan")
+        print(f"{name:<9} {recall:7.2f} {precision:10.2f} {1000 * stats['seconds'] / len(frames):9.1f}")
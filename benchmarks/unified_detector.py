@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.roi_inference import match
+from modules.face_detection import FaceDetector
+from modules.object_backends import load_calibration_frames
+from modules.object_detection import ObjectDetector
+from modules.unified_detection import UnifiedDetector
+
+# One unified YOLOv5 pass against the two-model baseline:
+#   python -m benchmarks.unified_detector session.mp4 --weights runs/unified/full/weights/best.pt
+# The baseline runs best.pt and the face detector on every frame, as a frame
+# on which both are due would; the unified path runs one pass of the
+# fine-tuned model. Latency is per frame (face + object inference). The
+# baseline's outputs are the reference for the unified model's object recall
+# and for how often it reports the same number of faces.
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("frames", help="Directory of images or a recorded video")
+    parser.add_argument("--weights", required=True, help="Fine-tuned unified weights")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--faces", default="mtcnn", choices=["mtcnn", "yunet", "haar"])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_calibration_frames(args.frames, args.count)
+    objects = ObjectDetector(backend=args.backend)
+    faces = FaceDetector(backend=args.faces)
+    unified = UnifiedDetector(backend=args.backend, weights_path=args.weights)
+    for frame in frames[:args.warmup]:
+        objects.detect(frame)
+        faces.detect_raw(frame)
+        unified.detect_all(frame.copy())
+
+    baseline_times, unified_times = [], []
+    reference_total = found = detected = same_count = 0
+    for frame in frames:
+        reference, object_time = timed(lambda: objects.detect(frame))
+        reference_faces, face_time = timed(lambda: faces.detect_raw(frame))
+        baseline_times.append(object_time + face_time)
+
+        # A fresh array each time so the unified detector's per-frame cache never hits
+        copy = frame.copy()
+        (detections, unified_faces), unified_time = timed(lambda: unified.detect_all(copy))
+        unified_times.append(unified_time)
+
+        reference_total += len(reference)
+        found += match(reference, detections)
+        detected += len(detections)
+        same_count += len(unified_faces) == len(reference_faces)
+
+    print(f"{len(frames)} frames, {reference_total} baseline object detections")
+    print(f"{'path':<9} {'mean ms':>8} {'p50 ms':>7} {'p90 ms':>7}")
+    for name, times in (("baseline", baseline_times), ("unified", unified_times)):
+        ms = 1000 * np.asarray(times)
+        print(f"{name:<9} {ms.mean():8.1f} {np.percentile(ms, 50):7.1f} {np.percentile(ms, 90):7.1f}")
+    recall = found / reference_total if reference_total else float("nan")
+    precision = found / detected if detected else float("nan")
+    print(f"unified vs baseline: object recall {recall:.2f}, precision {precision:.2f}, "
+          f"same face count on {100 * same_count / len(frames):.0f}% of frames")
@@ -0,0 +1,96 @@
+import argparse
+import threading
+import time
+
+from modules.violations import ViolationEngine, ViolationPolicy
+
+# Pushes events from several producer threads through the violation engine:
+#   python -m benchmarks.violation_stress [--producers 8] [--seconds 3]
+# Cooldowns run on a simulated clock that advances with every event, so many
+# violations are accepted and the warning limit is eventually reached. Reports
+# throughput and UI batch rate, and checks the engine's invariants.
+
+KINDS = ["objects:mobile phone", "objects:book", "faces:no_face", "faces:multiple_faces", "audio", "system"]
+MESSAGES = {
+    "objects:mobile phone": "Warning: Mobile phone detected",
+    "objects:book": "Abnormal Movement Detected: book (Confidence: 0.60)",
+    "faces:no_face": "Face not visible, please show your face",
+    "faces:multiple_faces": "Abnormal Movement Detected: Multiple faces detected!",
+    "audio": "Suspicious sound detected - Speech (Confidence: 0.50)",
+    "system": "Attempt to exit fullscreen detected!",
+}
+
+
+class SimulatedClock:
+    def __init__(self, step):
+        self.step = step
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.now += self.step
+            return self.now
+
+
+def producer(engine, index, deadline, counts):
+    sent = 0
+    while time.monotonic() < deadline:
+        kind = KINDS[(index + sent) % len(KINDS)]
+        engine.submit(MESSAGES[kind], kind.split(":")[0], 0.5, kind=kind)
+        sent += 1
+    counts[index] = sent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--max-warnings", type=int, default=1000)
+    parser.add_argument("--clock-step", type=float, default=0.001, help="Simulated seconds per event")
+    args = parser.parse_args()
+
+    policy = ViolationPolicy(args.max_warnings, cooldown=15, clock=SimulatedClock(args.clock_step))
+    batches = []
+    batch_lock = threading.Lock()
+    decisions = []
+
+    def on_batch(batch):
+        with batch_lock:
+            batches.append((time.monotonic(), batch))
+
+    def on_decision(event, decision):
+        decisions.append(decision)
+
+    engine = ViolationEngine(policy, on_batch, on_decision=on_decision, batch_interval=0.1).start()
+    counts = [0] * args.producers
+    start = time.monotonic()
+    deadline = start + args.seconds
+    threads = [threading.Thread(target=producer, args=(engine, i, deadline, counts)) for i in range(args.producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    submitted = sum(counts)
+    # Wait for the engine to drain the queue
+    while engine.received < submitted:
+        time.sleep(0.01)
+    drained = time.monotonic() - start
+    engine.stop()
+
+    counted = [d for d in decisions if d["counted"]]
+    delivered = sum(len(batch["decisions"]) for _, batch in batches)
+    gaps = [b - a for (a, _), (b, _) in zip(batches, batches[1:])]
+    print(f"{submitted} events from {args.producers} producers in {args.seconds:.1f}s "
+          f"({submitted / args.seconds:,.0f} submitted/s, {engine.received / drained:,.0f} processed/s)")
+    print(f"{engine.accepted} accepted ({len(counted)} counted), {len(batches)} UI batches "
+          f"(min gap {min(gaps) * 1000 if gaps else 0:.0f} ms), terminated: {engine.terminated}")
+
+    # Invariants
+    assert engine.received == submitted, "events lost"
+    assert delivered == engine.accepted, "accepted decisions missing from UI batches"
+    assert policy.warning_count == len(counted) <= args.max_warnings, "warning count out of step"
+    assert [d["warning_count"] for d in counted] == list(range(1, len(counted) + 1)), "non-monotonic count"
+    assert not engine.terminated or counted[-1]["terminate"], "terminated without a terminating violation"
+    assert all(gap >= 0.1 * 0.9 for gap in gaps[:-1]), "UI batches not coalesced"
+    print("invariants hold")
@@ -0,0 +1,86 @@
+import json
+import time
+from contextlib import contextmanager
+
+from modules.metrics import get_metrics
+
+
+def alert_script(message):
+    # JS call with the message as a JSON string literal: quotes, backslashes,
+    # newlines and "</script>" cannot break out of it, and the page sets it as
+    # text, not HTML
+    literal = json.dumps(str(message)).replace("</", "<\\/")
+    return f"setAlert({literal});"
+
+
+class AlertPresenter:
+    # Rate-limited front end for the alert overlay. The overlay page is loaded
+    # once and keeps a single alert element; each update only replaces its
+    # text. Messages arriving within `min_interval` of the last update are
+    # coalesced and only the newest one is shown when tick() runs. Windows are
+    # restacked with each overlay update and when something may have covered
+    # them (focus lost, or the exam page activated), not on every tick. Toolkit calls
+    # are injected (run_js, show, restack) so this holds no GUI state itself;
+    # the time spent in them is recorded as the "overlay" stage.
+    def __init__(self, run_js, show, restack, min_interval=0.5, clock=time.monotonic):
+        self.run_js = run_js
+        self.show = show
+        self.restack = restack
+        self.min_interval = min_interval
+        self.clock = clock
+        self.shown = False
+        self.pending = None
+        self.last_update = float("-inf")
+        self.updates = 0
+        self.coalesced = 0
+        self.restacks = 0
+        self.ui_seconds = 0.0
+
+    def post(self, message):
+        if self.pending is not None:
+            self.coalesced += 1
+        self.pending = message
+        self.tick()
+
+    def tick(self, now=None):
+        # Called on every UI timer tick; cheap when there is nothing to do
+        if self.pending is None:
+            return
+        now = self.clock() if now is None else now
+        if now - self.last_update < self.min_interval:
+            return
+        message, self.pending = self.pending, None
+        self.last_update = now
+        self.updates += 1
+        with self.timed():
+            if not self.shown:
+                self.show()
+                self.shown = True
+            self.run_js(alert_script(message))
+            # The exam page may have been raised above the overlay since
+            self.restacks += 1
+            self.restack()
+
+    def focus_changed(self, active):
+        if not active:
+            self.covered()
+
+    def covered(self):
+        # Another window (e.g. the fullscreen exam page) may now be on top
+        self.restacks += 1
+        with self.timed():
+            self.restack()
+
+    @contextmanager
+    def timed(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.ui_seconds += elapsed
+            get_metrics().observe("stage_seconds", elapsed, stage="overlay")
+
+    def stats(self):
+        return {"updates": self.updates, "coalesced": self.coalesced, "restacks": self.restacks,
+                "ui_ms": self.ui_seconds * 1000}
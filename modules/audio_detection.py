@@ -1,20 +1,153 @@
+import csv
+import os
+
 import numpy as np
 import sounddevice as sd
-import tensorflow as tf
-import tensorflow_hub as hub
 import threading
+import time
+
+from modules.utils import debug
+from modules.model_cache import get_model_cache
+from modules.process_workers import DetectorProcess
+from modules.metrics import get_metrics
+from modules.vad import VoiceActivityGate, normalize_level
+
+# YAMNet display names to watch and the pooled score above which each one is
+# reported. Any class in the model's class map can be added, e.g. "Typing".
+DEFAULT_MONITORED_CLASSES = {
+    "Speech": 0.3,
+    "Whispering": 0.3,
+    "Conversation": 0.3,  # Several people talking
+}
+
+
+def load_class_names(model_dir):
+    # The 521 YAMNet display names in score-column order, from the model's own class map
+    with open(os.path.join(model_dir, 'assets', 'yamnet_class_map.csv'), newline='') as f:
+        return [row['display_name'] for row in csv.DictReader(f)]
+
+
+def pool_scores(scores, pooling):
+    # Pool (frames, classes) over time: 'mean', 'max' or a percentile such as 'p90'
+    if pooling == 'max':
+        return scores.max(axis=0)
+    if pooling == 'mean':
+        return scores.mean(axis=0)
+    return np.percentile(scores, float(pooling[1:]), axis=0)
+
+
+class AudioRingBuffer:
+    # Preallocated mono float32 ring buffer. Samples are addressed by their
+    # absolute position in the stream, so readers can tell whether a span is
+    # still available or has already been overwritten.
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.total_written = 0
+        self.lock = threading.Lock()
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        if len(samples) > self.capacity:
+            skipped = len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+        else:
+            skipped = 0
+        with self.lock:
+            start = (self.total_written + skipped) % self.capacity
+            end = start + len(samples)
+            if end <= self.capacity:
+                self.buffer[start:end] = samples
+            else:
+                split = self.capacity - start
+                self.buffer[start:] = samples[:split]
+                self.buffer[:end - self.capacity] = samples[split:]
+            self.total_written += skipped + len(samples)
+
+    def read(self, start, length):
+        # Copy `length` samples starting at absolute position `start`
+        with self.lock:
+            if start < self.total_written - self.capacity or start + length > self.total_written:
+                return None
+            begin = start % self.capacity
+            end = begin + length
+            if end <= self.capacity:
+                return self.buffer[begin:end].copy()
+            return np.concatenate((self.buffer[begin:], self.buffer[:end - self.capacity]))
 
 class AudioDetector:
-    def __init__(self, sample_rate=16000, chunk_size=1024, detection_interval=5.0):
+    def __init__(self, sample_rate=16000, chunk_size=1024, detection_interval=5.0,
+                 window_seconds=0.975, hop_seconds=0.48, latency=1.0, buffer_seconds=10.0,
+                 model_handle='https://tfhub.dev/google/yamnet/1', isolated=False, threads=1, affinity=None,
+                 monitored_classes=None, pooling='max', vad=True, vad_options=None):
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         self.detection_interval = detection_interval
-        self.model = hub.load('https://tfhub.dev/google/yamnet/1')
-        self.class_names = ['Speech', 'Whispering']
+        # Loaded from the local model cache; downloaded only on the first run.
+        # TensorFlow is imported here so importing this module stays cheap. With
+        # `isolated`, YAMNet runs in its own process instead.
+        self.process = None
+        self.model = None
+        if isolated:
+            self.process = DetectorProcess('audio', {'sample_rate': sample_rate, 'model_handle': model_handle},
+                                           threads, affinity)
+            self.process.start()
+            # The worker has cached the model by now, so this only reads the class map
+            model_dir = get_model_cache().resolve_hub('yamnet', model_handle)
+        else:
+            import tensorflow_hub as hub
+            model_dir = get_model_cache().resolve_hub('yamnet', model_handle)
+            self.model = hub.load(model_dir)
+
+        # Monitored classes are resolved to score columns once
+        self.class_names = load_class_names(model_dir)
+        monitored = monitored_classes or DEFAULT_MONITORED_CLASSES
+        unknown = [name for name in monitored if name not in self.class_names]
+        if unknown:
+            raise ValueError(f"Unknown YAMNet classes: {', '.join(unknown)}")
+        self.monitored_names = list(monitored)
+        self.monitored_idx = np.array([self.class_names.index(name) for name in self.monitored_names])
+        self.thresholds = np.array([monitored[name] for name in self.monitored_names], dtype=np.float32)
+        self.pooling = pooling  # Streaming pooling over the frames of each scoring pass
         self.audio_buffer = []
         self.running = True
         self.lock = threading.Lock()
 
+        # Streaming mode: overlapping windows over the whole stream. The defaults
+        # match YAMNet's own patch size (0.975 s) and hop (0.48 s), so one model
+        # call over a contiguous span scores every window in it.
+        self.window_size = int(window_seconds * sample_rate)
+        self.hop_size = int(hop_seconds * sample_rate)
+        self.latency = latency  # Seconds between scoring passes (upper bound on detection delay)
+        self.ring = AudioRingBuffer(buffer_seconds * sample_rate)
+        self.stream = None
+        self.scoring_thread = None
+        self.next_window_start = 0
+        self.windows_scored = 0
+        self.samples_dropped = 0
+        get_metrics().register_callback("audio_samples_dropped_total", "counter", lambda: self.samples_dropped)
+
+        # Voice activity gate: YAMNet only runs on windows with voice-like activity
+        self.vad = VoiceActivityGate(sample_rate, **(vad_options or {})) if vad else None
+        if self.vad is not None:
+            get_metrics().register_callback("audio_vad_skip_ratio", "gauge", self.vad.skip_ratio)
+
+    def configure(self, config):
+        # Applied to the running detector (an AudioConfig). Thresholds of the
+        # monitored classes change in place (one array swap, so the scoring
+        # thread never sees a half-updated set); watching other classes needs a
+        # restart.
+        thresholds = self.thresholds.copy()
+        for name, threshold in config.thresholds.items():
+            if name in self.monitored_names:
+                thresholds[self.monitored_names.index(name)] = float(threshold)
+            else:
+                print(f"Audio class '{name}' is not monitored; restart to watch it")
+        self.thresholds = thresholds
+        self.pooling = config.pooling
+        self.latency = config.latency
+        self.detection_interval = config.detection_interval
+
     def detect_audio(self):
         try:
             # Record audio
@@ -22,42 +155,149 @@ class AudioDetector:
             audio = audio.flatten()
             
             # Debug: Print audio data statistics
-            print(f"Audio data - Mean: {np.mean(audio):.4f}, Max: {np.max(audio):.4f}, Min: {np.min(audio):.4f}")
-            
-            # Normalize audio to [-1, 1]
-            audio = audio / np.max(np.abs(audio) + 1e-7)
+            debug(f"Audio data - Mean: {np.mean(audio):.4f}, Max: {np.max(audio):.4f}, Min: {np.min(audio):.4f}")
+            get_metrics().set("audio_input_peak", float(np.max(np.abs(audio))))
             
             # Ensure audio is at 16kHz
             if len(audio) < self.sample_rate:
                 audio = np.pad(audio, (0, self.sample_rate - len(audio)), 'constant')
             audio = audio[:self.sample_rate]
             
-            # Run YAMNet model
-            scores, _, _ = self.model(audio)
-            scores = scores.numpy()
-            
-            # Average scores over time
-            avg_scores = np.mean(scores, axis=0)
-            
-            # Check for suspicious sounds (speech or whispering)
-            speech_idx = self.class_names.index('Speech')
-            whisper_idx = self.class_names.index('Whispering')
-            
-            speech_confidence = avg_scores[speech_idx]
-            whisper_confidence = avg_scores[whisper_idx]
-            
-            # Lowered threshold for speech detection
-            if speech_confidence > 0.3 or whisper_confidence > 0.3:
-                if speech_confidence > whisper_confidence:
-                    return True, speech_confidence, f"Suspicious sound detected - Speech (Confidence: {speech_confidence:.2f})"
-                else:
-                    return True, whisper_confidence, f"Suspicious sound detected - Whispering (Confidence: {whisper_confidence:.2f})"
-            
-            return False, 0.0, ""
+            # Silent room: skip the model
+            if self.vad is not None and not self.vad.is_active(audio):
+                return False, 0.0, ""
+            return self.score_audio(audio)
         
         except Exception as e:
             print(f"Error in audio detection: {e}")
             return False, 0.0, ""
 
+    def score_audio(self, audio, pooling='mean'):
+        return self.score_batch([audio], pooling)[0]
+
+    def score_batch(self, chunks, pooling='mean'):
+        # Score several independent clips (e.g. from different candidates) with one
+        # model call. Each clip is placed on YAMNet's hop grid and only the frames
+        # lying entirely inside it are pooled for it.
+        spans = []
+        offset = 0
+        for chunk in chunks:
+            length = max(len(chunk), self.window_size)
+            frames = 1 + (length - self.window_size) // self.hop_size
+            spans.append((offset, len(chunk), frames))
+            offset += -(-length // self.hop_size) * self.hop_size
+
+        audio = np.zeros(offset - self.hop_size + self.window_size, dtype=np.float32)
+        for (start, length, _), chunk in zip(spans, chunks):
+            audio[start:start + length] = normalize_level(np.asarray(chunk, dtype=np.float32))
+
+        # Run YAMNet model
+        scores = self.run_model(audio)
+        groups = [scores[start // self.hop_size:start // self.hop_size + frames] for start, _, frames in spans]
+        return self.evaluate_groups(groups, pooling)
+
+    def run_model(self, audio):
+        # Frame-level YAMNet scores (frames x 521) for a mono 16 kHz waveform
+        metrics = get_metrics()
+        metrics.inc("inferences_total", model="audio")
+        with metrics.timer("inference_seconds", model="audio"):
+            if self.process is not None:
+                return self.process.call(np.ascontiguousarray(audio, dtype=np.float32))
+            scores, _, _ = self.model(audio)
+            return scores.numpy()
+
+    def evaluate_scores(self, scores, pooling='mean'):
+        return self.evaluate_groups([scores], pooling)[0]
+
+    def evaluate_groups(self, groups, pooling='mean'):
+        # Pool each group of frame scores over time (the one-shot path averages,
+        # streaming takes the strongest window so short utterances are not
+        # diluted), then threshold every monitored class of every group at once.
+        # Returns one (is_suspicious, confidence, message) per group.
+        pooled = np.stack([pool_scores(np.asarray(group)[:, self.monitored_idx], pooling) for group in groups])
+        hits = pooled > self.thresholds
+        # Report the monitored class furthest above its own threshold
+        best = np.where(hits, pooled - self.thresholds, -np.inf).argmax(axis=1)
+        results = []
+        for i, column in enumerate(best):
+            if not hits[i, column]:
+                results.append((False, 0.0, ""))
+                continue
+            confidence = float(pooled[i, column])
+            name = self.monitored_names[column]
+            results.append((True, confidence, f"Suspicious sound detected - {name} (Confidence: {confidence:.2f})"))
+        return results
+
+    def start_stream(self, on_detection):
+        # Continuous capture: the sounddevice callback fills the ring buffer and a
+        # scoring thread runs YAMNet over every window as it becomes available.
+        # on_detection(confidence, message) is called from the scoring thread.
+        self.running = True
+        self.next_window_start = self.ring.total_written
+        self.stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='float32',
+                                     blocksize=self.chunk_size, callback=self.audio_callback)
+        self.stream.start()
+        self.scoring_thread = threading.Thread(target=self.scoring_loop, args=(on_detection,))
+        self.scoring_thread.daemon = True
+        self.scoring_thread.start()
+
+    def audio_callback(self, indata, frames, time_info, status):
+        # Runs on the PortAudio thread: copy into the ring buffer and return
+        self.ring.write(indata[:, 0])
+
+    def scoring_loop(self, on_detection):
+        while self.running:
+            time.sleep(self.latency)
+            try:
+                with get_metrics().timer("stage_seconds", stage="audio"):
+                    is_suspicious, confidence, message = self.score_pending()
+            except Exception as e:
+                print(f"Error in audio detection: {e}")
+                continue
+            if is_suspicious:
+                on_detection(confidence, message)
+
+    def score_pending(self):
+        # Score all complete windows that arrived since the last pass in one model call
+        total = self.ring.total_written
+        oldest = total - self.ring.capacity
+        if self.next_window_start < oldest:
+            # Scoring fell behind and the ring wrapped; resume at the oldest sample kept
+            self.samples_dropped += oldest - self.next_window_start
+            self.next_window_start = oldest
+
+        available = total - self.next_window_start
+        if available < self.window_size:
+            return False, 0.0, ""
+
+        num_windows = 1 + (available - self.window_size) // self.hop_size
+        length = self.window_size + (num_windows - 1) * self.hop_size
+        audio = self.ring.read(self.next_window_start, length)
+        if audio is None:
+            return False, 0.0, ""
+        self.next_window_start += num_windows * self.hop_size
+        self.windows_scored += num_windows
+
+        metrics = get_metrics()
+        metrics.inc("audio_windows_total", num_windows)
+        metrics.set("audio_input_peak", float(np.max(np.abs(audio))))
+        active = np.ones(num_windows, dtype=bool)
+        if self.vad is not None:
+            active = self.vad.active_windows(audio, self.window_size, self.hop_size, num_windows)
+            if not active.any():
+                return False, 0.0, ""
+        # Run the model only over the span from the first to the last active window
+        first = int(np.argmax(active))
+        last = num_windows - 1 - int(np.argmax(active[::-1]))
+        audio = audio[first * self.hop_size:last * self.hop_size + self.window_size]
+        scores = self.run_model(normalize_level(audio))[:last - first + 1]
+        return self.evaluate_scores(scores[active[first:last + 1]], pooling=self.pooling)
+
     def close(self):
-        self.running = False
\ No newline at end of file
+        self.running = False
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        if self.process is not None:
+            self.process.stop()
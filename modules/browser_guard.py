@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+import psutil
+
+from modules.utils import debug
+
+# Browser executables, matched exactly (case-insensitive, without ".exe") so
+# unrelated processes such as "operator" or "bravesync" are never touched
+BROWSER_EXECUTABLES = frozenset([
+    "chrome", "google chrome", "chromium", "chromium-browser",
+    "firefox", "firefox-esr", "firefox-bin",
+    "msedge", "microsoft edge",
+    "safari",
+    "opera", "opera_gx",
+    "brave", "brave browser", "brave-browser",
+])
+
+
+def is_browser(name, executables=BROWSER_EXECUTABLES):
+    name = (name or "").lower()
+    if name.endswith(".exe"):
+        name = name[:-4]
+    return name in executables
+
+
+class BrowserGuard:
+    # Tracks browser processes for the duration of a test. One full scan at
+    # start, then a watcher that only inspects PIDs it has not seen before;
+    # at the end every tracked browser is terminated in bulk, with a bounded
+    # wait before escalating to kill. A PID is identified together with its
+    # creation time so a recycled PID is never killed by mistake.
+    def __init__(self, executables=BROWSER_EXECUTABLES, scan_interval=2.0):
+        self.executables = executables
+        self.scan_interval = scan_interval
+        self.tracked = {}  # pid -> create_time
+        self.seen = set()  # Every PID inspected so far, browser or not
+        self.processes_scanned = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.watcher = None
+
+    def start(self):
+        self.scan_all()
+        self.watcher = threading.Thread(target=self.watch, name="browser-guard", daemon=True)
+        self.watcher.start()
+
+    def scan_all(self):
+        for proc in psutil.process_iter(['pid', 'name', 'create_time']):
+            self.processes_scanned += 1
+            self.seen.add(proc.info['pid'])
+            if is_browser(proc.info['name'], self.executables):
+                self.track(proc.info['pid'], proc.info['create_time'])
+        debug(f"Browser guard: {len(self.tracked)} browser process(es) at test start")
+
+    def track(self, pid, create_time=None):
+        # Also used for browsers the session launches itself
+        if create_time is None:
+            try:
+                create_time = psutil.Process(pid).create_time()
+            except psutil.Error:
+                return
+        with self.lock:
+            self.tracked[pid] = create_time
+
+    def scan_new(self):
+        pids = set(psutil.pids())
+        for pid in pids - self.seen:
+            self.processes_scanned += 1
+            try:
+                proc = psutil.Process(pid)
+                if is_browser(proc.name(), self.executables):
+                    self.track(pid, proc.create_time())
+            except psutil.Error:
+                pass
+        # Forget exited PIDs so a reused PID is inspected again
+        self.seen = pids
+        with self.lock:
+            for pid in [pid for pid in self.tracked if pid not in pids]:
+                del self.tracked[pid]
+
+    def watch(self):
+        while not self.stop_event.wait(self.scan_interval):
+            try:
+                self.scan_new()
+            except Exception as e:
+                print(f"Error in browser guard: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.watcher is not None:
+            self.watcher.join(timeout=self.scan_interval + 1.0)
+
+    def processes(self):
+        procs = []
+        with self.lock:
+            tracked = list(self.tracked.items())
+        for pid, create_time in tracked:
+            if pid == os.getpid():
+                continue
+            try:
+                proc = psutil.Process(pid)
+                if proc.create_time() == create_time:
+                    procs.append(proc)
+            except psutil.Error:
+                pass
+        return procs
+
+    def terminate(self, timeout=3.0):
+        # Terminate everything at once, wait up to `timeout`, then kill the rest
+        start = time.monotonic()
+        self.stop()
+        self.scan_new()  # Catch browsers opened since the last watcher pass
+        procs = self.processes()
+        for proc in procs:
+            try:
+                proc.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(procs, timeout=timeout)
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.Error:
+                pass
+        _, still_alive = psutil.wait_procs(alive, timeout=1.0)
+        return {
+            "targeted": len(procs),
+            "killed": len(alive),
+            "survived": len(still_alive),
+            "processes_scanned": self.processes_scanned,
+            "seconds": time.monotonic() - start,
+        }
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field, fields, replace
+
+# Central configuration for the detection pipeline. Values are layered:
+# defaults < profile < JSON file < environment. The file is
+# CHEATSHIELD_CONFIG (default cheatshield.json, optional) and holds sections
+# named like the dataclasses below, plus an optional "profile" key.
+# CHEATSHIELD_PROFILE selects a profile, and any field can be overridden as
+# CHEATSHIELD_<SECTION>_<FIELD> (e.g. CHEATSHIELD_OBJECTS_CONF_THRES=0.3).
+# Everything except RESTART_FIELDS can be changed while a test is running;
+# ConfigWatcher picks up file edits and the window pushes them to the
+# running components without reloading any model.
+CONFIG_PATH = os.environ.get("CHEATSHIELD_CONFIG", "cheatshield.json")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass
+class ObjectsConfig:
+    backend: str = 'torch'  # 'torch' or 'onnx'
+    conf_thres: float = 0.2  # Lowered for better book detection
+    mobile_conf_thres: float = 0.4  # Mobile phones need more confidence
+    iou_thres: float = 0.45
+    interval: float = 0.8  # Seconds between runs (adapted at runtime by the scheduler)
+    roi: bool = True  # Run on the desk region below the face instead of the whole frame
+
+
+@dataclass
+class FacesConfig:
+    backend: str = 'mtcnn'  # 'mtcnn', 'yunet' or 'haar'
+    draw_threshold: float = 0.9  # Faces below this confidence are not drawn
+    interval: float = 0.2
+    redetect_every: int = 8  # Full detection every n-th update, a tracker in between
+    input_width: int = 320  # 0 runs the detector at full resolution
+
+
+@dataclass
+class AudioConfig:
+    thresholds: dict = field(default_factory=lambda: {"Speech": 0.3, "Whispering": 0.3, "Conversation": 0.3})
+    pooling: str = 'max'  # 'mean', 'max' or 'pNN'
+    latency: float = 1.0  # Seconds between scoring passes
+    detection_interval: float = 5.0  # Recording length of the blocking detect_audio() path
+    vad: bool = True
+
+
+@dataclass
+class CaptureConfig:
+    width: int = 640
+    height: int = 480
+    render_interval_ms: int = 100  # Preview refresh (10 FPS)
+
+
+@dataclass
+class MotionConfig:
+    gating: bool = True
+    threshold: float = 6.0  # Mean thumbnail difference that counts as a scene change
+
+
+@dataclass
+class ViolationsConfig:
+    max_warnings: int = 10
+    cooldown: float = 15.0  # Seconds per violation type
+    alpha: float = 0.4  # Temporal smoothing of detections
+    on_threshold: float = 0.5
+    off_threshold: float = 0.2
+    alert_interval: float = 0.5  # Minimum seconds between overlay updates
+    count_system: bool = False  # Count fullscreen exits and focus loss toward max_warnings
+
+
+@dataclass
+class Config:
+    profile: str = 'default'
+    objects: ObjectsConfig = field(default_factory=ObjectsConfig)
+    faces: FacesConfig = field(default_factory=FacesConfig)
+    audio: AudioConfig = field(default_factory=AudioConfig)
+    capture: CaptureConfig = field(default_factory=CaptureConfig)
+    motion: MotionConfig = field(default_factory=MotionConfig)
+    violations: ViolationsConfig = field(default_factory=ViolationsConfig)
+
+
+SECTIONS = [f.name for f in fields(Config) if f.name != 'profile']
+
+# Fields that pick models, backends or devices; changes apply at the next start
+RESTART_FIELDS = {"objects.backend", "faces.backend", "audio.vad", "capture.width", "capture.height",
+                  "motion.gating"}
+
+PROFILES = {
+    'default': {},
+    # Integrated GPU-less laptops: INT8-friendly ONNX backend (PyTorch when no
+    # export or runtime is installed), Haar faces on a small copy, longer
+    # intervals and less frequent audio scoring
+    'low-end-laptop': {
+        "objects": {"backend": 'onnx', "conf_thres": 0.25, "interval": 1.2},
+        "faces": {"backend": 'haar', "interval": 0.3, "redetect_every": 12, "input_width": 240},
+        "audio": {"latency": 2.0},
+        "capture": {"render_interval_ms": 150},
+        "motion": {"threshold": 8.0},
+    },
+    # Desktop machines with a GPU or many cores: full-frame objects at a high
+    # rate, MTCNN at full resolution, lower audio latency
+    'lab-workstation': {
+        "objects": {"interval": 0.4, "roi": False},
+        "faces": {"interval": 0.1, "redetect_every": 4, "input_width": 0},
+        "audio": {"latency": 0.5},
+        "capture": {"width": 1280, "height": 720, "render_interval_ms": 66},
+        "motion": {"threshold": 4.0},
+    },
+}
+
+
+def coerce(value, kind, name):
+    # Values from JSON or the environment (strings) to the field's type
+    if isinstance(value, str) and kind is not str:
+        try:
+            if kind is bool:
+                if value.lower() not in ("1", "0", "true", "false", "yes", "no"):
+                    raise ValueError(value)
+                return value.lower() in ("1", "true", "yes")
+            value = json.loads(value) if kind is dict else kind(value)
+        except ValueError:
+            raise ConfigError(f"{name}: cannot parse {value!r} as {kind.__name__}")
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, kind) or (kind is not bool and isinstance(value, bool)):
+        raise ConfigError(f"{name}: expected {kind.__name__}, got {value!r}")
+    return value
+
+
+def merge(config, overrides, source):
+    # New Config with `overrides` ({section: {field: value}}) applied and type checked
+    sections = {}
+    for section, values in overrides.items():
+        if section not in SECTIONS:
+            raise ConfigError(f"{source}: unknown section '{section}'")
+        if not isinstance(values, dict):
+            raise ConfigError(f"{source}: section '{section}' must be an object")
+        current = getattr(config, section)
+        types = {f.name: f.type for f in fields(current)}
+        changes = {}
+        for name, value in values.items():
+            if name not in types:
+                raise ConfigError(f"{source}: unknown setting '{section}.{name}'")
+            changes[name] = coerce(value, types[name], f"{source}: {section}.{name}")
+        sections[section] = replace(current, **changes)
+    return replace(config, **sections)
+
+
+def env_overrides(environ):
+    overrides = {}
+    for section in SECTIONS:
+        for f in fields(getattr(Config(), section)):
+            value = environ.get(f"CHEATSHIELD_{section}_{f.name}".upper())
+            if value is not None:
+                overrides.setdefault(section, {})[f.name] = value
+    return overrides
+
+
+def load_config(path=None, profile=None, environ=None, default_profile='default'):
+    environ = os.environ if environ is None else environ
+    path = path or CONFIG_PATH
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"{path}: {e}")
+        if not isinstance(data, dict):
+            raise ConfigError(f"{path}: expected a JSON object")
+    data = dict(data)
+    profile = profile or environ.get("CHEATSHIELD_PROFILE") or data.pop("profile", None) or default_profile
+    data.pop("profile", None)
+    if profile not in PROFILES:
+        raise ConfigError(f"Unknown profile '{profile}' (known: {', '.join(PROFILES)})")
+
+    config = merge(Config(profile=profile), PROFILES[profile], f"profile {profile}")
+    config = merge(config, data, path)
+    return merge(config, env_overrides(environ), "environment")
+
+
+def changed_fields(old, new):
+    # "section.field" names whose value differs
+    changed = []
+    for section in SECTIONS:
+        before, after = getattr(old, section), getattr(new, section)
+        changed += [f"{section}.{f.name}" for f in fields(before)
+                    if getattr(before, f.name) != getattr(after, f.name)]
+    return changed
+
+
+class ConfigWatcher:
+    # Polls the config file's modification time and reloads it when it
+    # changes. on_change(config, changed) runs on the watcher thread for every
+    # reload that changed something; a file that fails to load or validate is
+    # reported and the previous configuration stays in effect.
+    def __init__(self, config, on_change, path=None, interval=2.0, environ=None):
+        self.config = config
+        self.on_change = on_change
+        self.path = path or CONFIG_PATH
+        self.interval = interval
+        self.environ = environ
+        self.mtime = self.current_mtime()
+        self.reloads = 0
+        self.errors = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name="config-watcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def current_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def watch(self):
+        while not self.stopped.wait(self.interval):
+            mtime = self.current_mtime()
+            if mtime != self.mtime:
+                self.mtime = mtime
+                self.reload()
+
+    def reload(self):
+        # The profile is kept unless the file names another one
+        try:
+            config = load_config(self.path, environ=self.environ, default_profile=self.config.profile)
+        except ConfigError as e:
+            self.errors += 1
+            print(f"Configuration not reloaded: {e}")
+            return None
+        changed = changed_fields(self.config, config)
+        self.config = config
+        if changed:
+            self.reloads += 1
+            self.on_change(config, changed)
+        return changed
+
+    def stop(self):
+        self.stopped.set()
+
+
+if __name__ == "__main__":
+    # Prints the effective configuration: python -m modules.config [profile]
+    import sys
+    from dataclasses import asdict
+
+    print(json.dumps(asdict(load_config(profile=sys.argv[1] if len(sys.argv) > 1 else None)), indent=2))
@@ -0,0 +1,202 @@
+import collections
+import io
+import json
+import os
+import queue
+import threading
+import time
+import wave
+import zipfile
+
+import cv2
+import numpy as np
+
+from modules.pipeline import LatestQueue
+from modules.utils import debug, to_json
+
+
+class EvidenceRecorder:
+    # Keeps the last `seconds` of webcam frames as JPEG bytes in RAM (sampled at
+    # `fps`, capped at `max_bytes`) and, when a violation is triggered, writes
+    # the `pre_seconds` before and `post_seconds` after it to a zip clip:
+    # frames/*.jpg, audio.wav from the audio detector's ring buffer, and
+    # metadata.json with the violation and the detection boxes seen during the
+    # clip. Capture only hands over a frame reference; encoding, clip assembly
+    # and disk writes run on the recorder's own threads, and every buffer and
+    # queue is bounded so memory per session stays constant.
+    def __init__(self, out_dir=os.path.join("logs", "evidence"), session_id="session", seconds=20.0, fps=5.0,
+                 jpeg_quality=70, max_bytes=16 * 1024 * 1024, pre_seconds=10.0, post_seconds=5.0,
+                 max_pending=8, clock=time.monotonic):
+        self.out_dir = out_dir
+        self.session_id = session_id
+        self.seconds = seconds
+        self.interval = 1.0 / fps
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self.pre_seconds = min(pre_seconds, seconds)
+        self.post_seconds = post_seconds
+        self.max_pending = max_pending
+        self.clock = clock
+
+        self.incoming = LatestQueue(maxsize=2)
+        self.frames = collections.deque()  # (timestamp, jpeg bytes)
+        self.frame_bytes = 0
+        self.detections = collections.deque(maxlen=int(seconds * 20))  # (timestamp, boxes)
+        self.last_sampled = 0.0
+        self.audio_ring = None
+        self.sample_rate = None
+        self.pending = []  # Clips waiting for their post-event window
+        self.lock = threading.Lock()
+        self.clips = queue.Queue(maxsize=4)
+        self.clip_count = 0
+        self.clips_dropped = 0
+        self.stopped = threading.Event()
+        self.recorder = threading.Thread(target=self.record, name="evidence-recorder", daemon=True)
+        self.writer = threading.Thread(target=self.write_clips, name="evidence-writer", daemon=True)
+        self.recorder.start()
+        self.writer.start()
+
+    def set_audio(self, ring, sample_rate):
+        # Audio comes from the detector's AudioRingBuffer once it is loaded
+        self.audio_ring = ring
+        self.sample_rate = sample_rate
+
+    def add_frame(self, frame):
+        # Called on the capture thread: a timestamp check and a non-blocking put
+        if frame.timestamp - self.last_sampled < self.interval:
+            return
+        self.last_sampled = frame.timestamp
+        self.incoming.put(frame)
+
+    def add_detections(self, result):
+        boxes = {}
+        if result["detections"] is not None:
+            boxes["objects"] = result["detections"]
+        if result["faces"] is not None:
+            boxes["faces"] = [face['box'] for face in result["faces"]]
+        with self.lock:
+            self.detections.append((result["frame"].timestamp, boxes))
+
+    def trigger(self, message, detector, confidence=None, boxes=None):
+        # Schedules a clip around now; returns the path it will be written to
+        now = self.clock()
+        with self.lock:
+            self.clip_count += 1
+            path = os.path.join(self.out_dir, f"{self.session_id}-{self.clip_count:03d}.zip")
+            if len(self.pending) >= self.max_pending:
+                self.pending.pop(0)
+                self.clips_dropped += 1
+            self.pending.append({
+                "path": path,
+                "time": now,
+                "wall_time": time.time(),
+                "message": message,
+                "detector": detector,
+                "confidence": confidence,
+                "boxes": boxes,
+            })
+        return path
+
+    def record(self):
+        while not self.stopped.is_set():
+            frame = self.incoming.get(timeout=0.1)
+            if frame is not None:
+                ok, jpeg = cv2.imencode('.jpg', frame.bgr, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if ok:
+                    self.append(frame.timestamp, jpeg.tobytes())
+            self.flush_due(self.clock())
+
+    def append(self, timestamp, jpeg):
+        with self.lock:
+            self.frames.append((timestamp, jpeg))
+            self.frame_bytes += len(jpeg)
+            while self.frames and (self.frame_bytes > self.max_bytes or
+                                   self.frames[0][0] < timestamp - self.seconds):
+                self.frame_bytes -= len(self.frames.popleft()[1])
+
+    def flush_due(self, now, force=False):
+        with self.lock:
+            due = [clip for clip in self.pending if force or now >= clip["time"] + self.post_seconds]
+            if not due:
+                return
+            self.pending = [clip for clip in self.pending if not any(clip is d for d in due)]
+            frames = list(self.frames)
+            detections = list(self.detections)
+        for clip in due:
+            start, end = clip["time"] - self.pre_seconds, min(now, clip["time"] + self.post_seconds)
+            clip["frames"] = [(t, jpeg) for t, jpeg in frames if start <= t <= end]
+            clip["detections"] = [(t, boxes) for t, boxes in detections if start <= t <= end]
+            clip["audio"] = self.audio_span(start, end, now)
+            clip["start"], clip["end"] = start, end
+            try:
+                self.clips.put_nowait(clip)
+            except queue.Full:
+                self.clips_dropped += 1
+
+    def audio_span(self, start, end, now):
+        ring = self.audio_ring
+        if ring is None:
+            return None
+        total = ring.total_written
+        first = max(total - int((now - start) * self.sample_rate), total - ring.capacity, 0)
+        last = total - int((now - end) * self.sample_rate)
+        if last <= first:
+            return None
+        return ring.read(first, last - first)
+
+    def write_clips(self):
+        while True:
+            clip = self.clips.get()
+            if clip is None:
+                break
+            try:
+                self.write(clip)
+            except Exception as e:
+                print(f"Error writing evidence clip: {e}")
+
+    def write(self, clip):
+        os.makedirs(self.out_dir, exist_ok=True)
+        metadata = {
+            "session_id": self.session_id,
+            "timestamp": clip["wall_time"],
+            "message": clip["message"],
+            "detector": clip["detector"],
+            "confidence": clip["confidence"],
+            "boxes": clip["boxes"],
+            # Times are seconds relative to the violation
+            "frames": [],
+            "detections": [{"time": t - clip["time"], **boxes} for t, boxes in clip["detections"]],
+            "audio": None,
+        }
+        tmp_path = clip["path"] + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w") as archive:
+            for i, (t, jpeg) in enumerate(clip["frames"]):
+                name = f"frames/{i:05d}.jpg"
+                archive.writestr(name, jpeg, compress_type=zipfile.ZIP_STORED)
+                metadata["frames"].append({"file": name, "time": t - clip["time"]})
+            if clip["audio"] is not None and len(clip["audio"]):
+                buffer = io.BytesIO()
+                with wave.open(buffer, "wb") as wav:
+                    wav.setnchannels(1)
+                    wav.setsampwidth(2)
+                    wav.setframerate(self.sample_rate)
+                    wav.writeframes((np.clip(clip["audio"], -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+                archive.writestr("audio.wav", buffer.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+                duration = len(clip["audio"]) / self.sample_rate
+                metadata["audio"] = {"file": "audio.wav", "start": clip["end"] - clip["time"] - duration,
+                                     "sample_rate": self.sample_rate}
+            archive.writestr("metadata.json", json.dumps(metadata, default=to_json, indent=2),
+                             compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, clip["path"])
+        debug(f"Evidence clip written: {clip['path']} ({len(clip['frames'])} frames)")
+
+    def memory_bytes(self):
+        return self.frame_bytes
+
+    def close(self):
+        # Writes clips that are still waiting with whatever post-event footage exists
+        self.stopped.set()
+        self.recorder.join(timeout=1.0)
+        self.flush_due(self.clock(), force=True)
+        self.clips.put(None)
+        self.writer.join(timeout=10.0)
@@ -1,30 +1,122 @@
 import cv2
-from mtcnn import MTCNN
 import numpy as np
 
+from modules.face_tracking import FaceTracker
+from modules.frame import as_bgr, as_rgb
+from modules.process_workers import DetectorProcess
+from modules.metrics import get_metrics
+from modules.roi import downscale
+
 class FaceDetector:
-    def __init__(self):
-        # Initialize the MTCNN detector
-        self.detector = MTCNN()
+    draw_threshold = 0.9  # Faces below this confidence are not drawn
+
+    def __init__(self, backend='mtcnn', tracking=False, redetect_every=10, tracker_type='kcf',
+                 yunet_model=r"models\face_detection_yunet_2023mar.onnx", isolated=False, threads=1, affinity=None,
+                 input_width=None):
+        # backend: 'mtcnn' (default, most accurate), 'yunet' (OpenCV DNN, needs the
+        # YuNet ONNX model) or 'haar' (OpenCV cascade, no extra files). With
+        # `input_width`, wider frames are downscaled to it before detection.
+        self.backend = backend
+        self.input_width = input_width
+        self.process = None
+        if isolated:
+            # The detector runs in its own process; tracking and drawing stay here
+            self.process = DetectorProcess('faces', {'backend': backend, 'yunet_model': yunet_model},
+                                           threads, affinity)
+            self.process.start()
+            self.detector = None
+        elif backend == 'yunet':
+            self.detector = cv2.FaceDetectorYN.create(yunet_model, "", (320, 320), 0.9)
+        elif backend == 'haar':
+            self.detector = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        else:
+            # Initialize the MTCNN detector (imported here so the other backends skip TensorFlow)
+            from mtcnn import MTCNN
+            self.detector = MTCNN()
+
+        # With tracking on, the detector above only runs periodically and faces are
+        # followed by a correlation tracker in between
+        self.tracker = FaceTracker(self.detect_raw, redetect_every, tracker_type) if tracking else None
+
+    def configure(self, config):
+        # Applied to the running detector (a FacesConfig); the backend is kept
+        self.draw_threshold = config.draw_threshold
+        self.input_width = config.input_width or None
+        if self.tracker is not None:
+            self.tracker.redetect_every = config.redetect_every
+
+    def detect_raw(self, frame):
+        # Run the configured detector on a Frame or BGR array; returns
+        # MTCNN-style [{'box': [x, y, w, h], 'confidence': c}]
+        metrics = get_metrics()
+        small, factor = downscale(as_bgr(frame), self.input_width)
+        with metrics.timer("inference_seconds", model="faces"):
+            faces = self.run_detector(frame if factor == 1.0 else small)
+        metrics.inc("inferences_total", model="faces")
+        if factor != 1.0:
+            for face in faces:
+                face['box'] = [int(round(v * factor)) for v in face['box']]
+        return faces
+
+    def run_detector(self, frame):
+        if self.process is not None:
+            return self.process.call(np.ascontiguousarray(as_bgr(frame)))
+        if self.backend == 'yunet':
+            h, w = frame.shape[:2]
+            self.detector.setInputSize((w, h))
+            _, faces = self.detector.detect(as_bgr(frame))
+            if faces is None:
+                return []
+            return [{'box': [int(v) for v in face[:4]], 'confidence': float(face[14])} for face in faces]
+        if self.backend == 'haar':
+            gray = cv2.cvtColor(as_bgr(frame), cv2.COLOR_BGR2GRAY)
+            boxes = self.detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+            return [{'box': [int(v) for v in box], 'confidence': 1.0} for box in boxes]
+
+        # MTCNN expects RGB images; a Frame hands over its shared RGB view
+        return self.detector.detect_faces(as_rgb(frame))
+
+    def locate(self, frame):
+        # Detect faces (or follow them with the tracker between detections) without drawing
+        if self.tracker is not None:
+            return self.tracker.update(frame)
+        return self.detect_raw(frame)
 
     def detect_faces(self, frame):
-        # Convert frame to RGB (MTCNN expects RGB images)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        faces = self.locate(frame)
 
-        # Detect faces
-        faces = self.detector.detect_faces(frame_rgb)
+        # Return the number of faces and the annotated frame
+        return len(faces), self.annotate(frame, faces)
 
-        # Draw bounding boxes around detected faces
+    def detect_faces_batch(self, frames):
+        # Frames from different streams: no tracking, one detector pass per frame
+        # (MTCNN takes the whole list at once). Returns (number of faces, annotated frame) pairs.
+        if self.backend == 'mtcnn' and self.process is None:
+            frames_rgb = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+            batch_faces = self.detector.detect_faces(frames_rgb)
+        else:
+            batch_faces = [self.detect_raw(frame) for frame in frames]
+        return [(len(faces), self.annotate(frame, faces)) for frame, faces in zip(frames, batch_faces)]
+
+    def annotate(self, frame, faces, scale=(1.0, 1.0), rgb=False):
+        # Draw bounding boxes around detected faces; `scale` maps frame coordinates
+        # onto a resized canvas and `rgb` swaps the BGR colour
+        sx, sy = scale
+        color = (0, 0, 255) if rgb else (255, 0, 0)
         for face in faces:
             x, y, w, h = face['box']
+            x, y, w, h = int(x * sx), int(y * sy), int(w * sx), int(h * sy)
             confidence = face['confidence']
-            if confidence > 0.9:  # Confidence threshold
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            if confidence > self.draw_threshold:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
                 cv2.putText(frame, f"Face {confidence:.2f}", (x, y - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        return frame
 
-        # Return the number of faces and the annotated frame
-        return len(faces), frame
+    def close(self):
+        # Stops the detector process when running isolated
+        if self.process is not None:
+            self.process.stop()
 
 # Example usage (for testing)
 if __name__ == "__main__":
@@ -44,4 +136,4 @@ if __name__ == "__main__":
             break
 
     cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    cv2.destroyAllWindows()
@@ -0,0 +1,69 @@
+import cv2
+
+from modules.frame import as_bgr
+
+
+def create_tracker(tracker_type='kcf'):
+    # KCF lives in opencv-contrib (cv2 or cv2.legacy depending on version); fall back
+    # to MIL, which ships with the stock opencv-python wheel
+    if tracker_type == 'kcf':
+        for factory in (getattr(cv2, 'TrackerKCF_create', None),
+                        getattr(getattr(cv2, 'legacy', None), 'TrackerKCF_create', None)):
+            if factory is not None:
+                return factory()
+    return cv2.TrackerMIL_create()
+
+
+class FaceTracker:
+    # Detect-then-track: the full face detector runs every `redetect_every`
+    # frames, as soon as any tracker loses its face, and on every frame while
+    # no face is tracked; frames in between only update cheap correlation
+    # trackers seeded from the last detection.
+    def __init__(self, detect_fn, redetect_every=10, tracker_type='kcf'):
+        self.detect_fn = detect_fn  # Frame or BGR array -> list of {'box': [x, y, w, h], 'confidence': c}
+        self.redetect_every = redetect_every
+        self.tracker_type = tracker_type
+        self.tracks = []  # (tracker, confidence)
+        self.frames_since_detect = None
+        self.detections = 0
+        self.tracked_frames = 0
+
+    def update(self, frame):
+        image = as_bgr(frame)
+        # Without tracks there is nothing to follow: keep detecting so a face
+        # that comes back is reported on the next update
+        if not self.tracks or self.frames_since_detect >= self.redetect_every:
+            return self.redetect(frame)
+
+        faces = []
+        for tracker, confidence in self.tracks:
+            ok, box = tracker.update(image)
+            if not ok:
+                # Tracking lost: fall back to a full detection on this frame
+                return self.redetect(frame)
+            faces.append({'box': [int(v) for v in box], 'confidence': confidence})
+        self.frames_since_detect += 1
+        self.tracked_frames += 1
+        return faces
+
+    def redetect(self, frame):
+        faces = self.detect_fn(frame)
+        self.detections += 1
+        self.frames_since_detect = 0
+        self.tracks = []
+        h, w = frame.shape[:2]
+        for face in faces:
+            x, y, bw, bh = face['box']
+            # Detectors can return boxes partly outside the frame; trackers cannot
+            x, y = max(0, x), max(0, y)
+            bw, bh = min(bw, w - x), min(bh, h - y)
+            if bw <= 0 or bh <= 0:
+                continue
+            tracker = create_tracker(self.tracker_type)
+            tracker.init(as_bgr(frame), (x, y, bw, bh))
+            self.tracks.append((tracker, face['confidence']))
+        return faces
+
+    def reset(self):
+        self.tracks = []
+        self.frames_since_detect = None
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def read_only(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class Frame:
+    # One captured webcam frame shared by every stage of the pipeline. The BGR
+    # capture buffer is converted to RGB at most once, on first use, and all
+    # consumers get read-only views of the same memory instead of their own copies.
+    def __init__(self, buffer, index=0, timestamp=None):
+        self.index = index
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.buffer = buffer
+        self.bgr = read_only(buffer)
+        self.rgb_buffer = None
+        self.rgb_view = None
+        self.lock = threading.Lock()
+
+    @property
+    def rgb(self):
+        with self.lock:
+            if self.rgb_view is None:
+                self.rgb_buffer = cv2.cvtColor(self.buffer, cv2.COLOR_BGR2RGB)
+                self.rgb_view = read_only(self.rgb_buffer)
+            return self.rgb_view
+
+    @property
+    def shape(self):
+        return self.buffer.shape
+
+
+def as_bgr(frame):
+    return frame.bgr if isinstance(frame, Frame) else frame
+
+
+def as_rgb(frame):
+    return frame.rgb if isinstance(frame, Frame) else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+class DisplayBuffer:
+    # Preallocated RGB preview image. Each frame is resized straight into the same
+    # buffer and overlays are drawn on top, so rendering allocates nothing per frame.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.buffer = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def render(self, frame):
+        # Returns the (x, y) scale from frame coordinates to display coordinates
+        cv2.resize(as_rgb(frame), (self.width, self.height), dst=self.buffer)
+        h, w = frame.shape[:2]
+        return self.width / w, self.height / h
@@ -0,0 +1,226 @@
+import argparse
+import collections
+import threading
+import time
+
+import cv2
+import psutil
+
+from modules.object_detection import ObjectDetector
+from modules.face_detection import FaceDetector
+from modules.audio_detection import AudioDetector
+
+
+class DynamicBatcher(threading.Thread):
+    # Collects requests from many sessions and runs them through `process_batch`
+    # once `max_batch_size` requests are waiting or the oldest one has waited
+    # `max_wait` seconds. Each session has at most one pending request (the
+    # latest wins), so a slow model never builds a backlog.
+    def __init__(self, process_batch, max_batch_size=8, max_wait=0.05):
+        super().__init__(daemon=True)
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = collections.OrderedDict()  # session_id -> (arrival time, payload, on_result)
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.dropped = 0
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, session_id, payload, on_result):
+        with self.cond:
+            if session_id in self.pending:
+                arrival = self.pending.pop(session_id)[0]
+                self.dropped += 1
+            else:
+                arrival = time.monotonic()
+            self.pending[session_id] = (arrival, payload, on_result)
+            self.cond.notify()
+
+    def next_batch(self):
+        with self.cond:
+            while not self.stopped:
+                if not self.pending:
+                    self.cond.wait(0.2)
+                    continue
+                oldest = min(arrival for arrival, _, _ in self.pending.values())
+                remaining = oldest + self.max_wait - time.monotonic()
+                if len(self.pending) >= self.max_batch_size or remaining <= 0:
+                    batch = []
+                    while self.pending and len(batch) < self.max_batch_size:
+                        session_id, (_, payload, on_result) = self.pending.popitem(last=False)
+                        batch.append((session_id, payload, on_result))
+                    return batch
+                self.cond.wait(remaining)
+            return None
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+            try:
+                results = self.process_batch([payload for _, payload, _ in batch])
+            except Exception as e:
+                print(f"Error in batched inference: {e}")
+                results = [None] * len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            for (session_id, _, on_result), result in zip(batch, results):
+                on_result(session_id, result)
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+
+class CandidateSession:
+    # Handle returned by InferenceServer.register_session; one per webcam/microphone
+    def __init__(self, server, session_id, on_result):
+        self.server = server
+        self.session_id = session_id
+        self.on_result = on_result
+        self.frames_submitted = 0
+        self.frames_completed = 0
+
+    def submit_frame(self, frame):
+        self.frames_submitted += 1
+        self.server.frame_batcher.submit(self.session_id, frame, self.server.route_frame_result)
+
+    def submit_audio(self, audio):
+        self.server.audio_batcher.submit(self.session_id, audio, self.server.route_audio_result)
+
+
+class InferenceServer:
+    # Loads YOLOv5, MTCNN and YAMNet once and serves any number of candidate
+    # sessions from the same weights. Frames are batched across sessions; results
+    # are routed back to each session's on_result(session_id, kind, result).
+    def __init__(self, max_batch_size=8, max_wait=0.05, object_detector=None, face_detector=None,
+                 audio_detector=None, enable_audio=True):
+        self.object_detector = object_detector or ObjectDetector()
+        self.face_detector = face_detector or FaceDetector()
+        if enable_audio:
+            self.audio_detector = audio_detector or AudioDetector()
+        else:
+            self.audio_detector = None
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.frame_batcher = DynamicBatcher(self.detect_frames, max_batch_size, max_wait)
+        self.audio_batcher = DynamicBatcher(self.detect_audio_chunks, max_batch_size, max_wait)
+        self.process = psutil.Process()
+        self.start_time = None
+        self.start_cpu = None
+
+    def start(self):
+        self.start_time = time.monotonic()
+        cpu = self.process.cpu_times()
+        self.start_cpu = cpu.user + cpu.system
+        self.frame_batcher.start()
+        if self.audio_detector is not None:
+            self.audio_batcher.start()
+
+    def stop(self):
+        self.frame_batcher.stop()
+        self.audio_batcher.stop()
+
+    def register_session(self, session_id, on_result):
+        with self.lock:
+            session = CandidateSession(self, session_id, on_result)
+            self.sessions[session_id] = session
+            return session
+
+    def unregister_session(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def detect_frames(self, frames):
+        objects = self.object_detector.process_batch(frames)
+        faces = self.face_detector.detect_faces_batch([frame for frame, _ in objects])
+        return [
+            {"frame": frame, "objects": alert, "num_faces": num_faces}
+            for (_, alert), (num_faces, frame) in zip(objects, faces)
+        ]
+
+    def detect_audio_chunks(self, chunks):
+        # All sessions' chunks go through YAMNet as one waveform
+        return self.audio_detector.score_batch(chunks)
+
+    def route_frame_result(self, session_id, result):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.frames_completed += 1
+            if result is not None:
+                session.on_result(session_id, "frame", result)
+
+    def route_audio_result(self, session_id, result):
+        session = self.sessions.get(session_id)
+        if session is not None and result is not None:
+            session.on_result(session_id, "audio", result)
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.start_time
+        cpu = self.process.cpu_times()
+        cpu_seconds = cpu.user + cpu.system - self.start_cpu
+        frames = self.frame_batcher.items
+        batches = self.frame_batcher.batches
+        return {
+            "frames": frames,
+            "elapsed": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            # Frames per CPU-second actually consumed, i.e. throughput per fully used core
+            "fps_per_core": frames / cpu_seconds if cpu_seconds > 0 else 0.0,
+            "cores": psutil.cpu_count(),
+            "mean_batch_size": frames / batches if batches else 0.0,
+            "dropped": self.frame_batcher.dropped,
+        }
+
+
+def replay_video(session, path, realtime):
+    # Stand-in for a webcam: push frames from a recorded video into a session
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        session.submit_frame(frame)
+        if realtime:
+            time.sleep(1.0 / fps)
+        else:
+            # Wait for the result so every frame is processed exactly once
+            while session.frames_completed < session.frames_submitted:
+                time.sleep(0.001)
+    cap.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve several candidate video streams from one set of models")
+    parser.add_argument("videos", nargs="+", help="Recorded videos standing in for candidate webcams")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=0.05, help="Seconds to wait for a batch to fill")
+    parser.add_argument("--realtime", action="store_true", help="Pace each video at its native frame rate")
+    args = parser.parse_args()
+
+    def on_result(session_id, kind, result):
+        if kind == "frame" and (result["objects"] or result["num_faces"] != 1):
+            print(f"[{session_id}] faces={result['num_faces']} {result['objects']}")
+
+    server = InferenceServer(args.max_batch_size, args.max_wait, enable_audio=False)
+    server.start()
+    threads = []
+    for i, path in enumerate(args.videos):
+        session = server.register_session(f"candidate-{i + 1}", on_result)
+        thread = threading.Thread(target=replay_video, args=(session, path, args.realtime))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    time.sleep(args.max_wait * 2)
+    server.stop()
+
+    stats = server.throughput()
+    print(f"Processed {stats['frames']} frames in {stats['elapsed']:.1f}s "
+          f"({stats['fps']:.1f} frames/s, {stats['fps_per_core']:.1f} frames/s per core on {stats['cores']} cores, "
+          f"mean batch {stats['mean_batch_size']:.1f}, dropped {stats['dropped']})")
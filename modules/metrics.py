@@ -0,0 +1,201 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+
+# CHEATSHIELD_METRICS_PORT=9108 serves /metrics in Prometheus text format on localhost
+METRICS_PORT = int(os.environ.get("CHEATSHIELD_METRICS_PORT", "0") or 0)
+
+# Latency buckets in seconds, from sub-millisecond drawing to multi-second model calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def label_value(value):
+    # Prometheus text format: backslash, double quote and newline are escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{label_value(value)}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.last = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.last = value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    # In-process counters, gauges and latency histograms keyed by name and
+    # labels. Recording is a dict lookup and an add under one lock; anything
+    # expensive (CPU, RSS, queue lengths) is a callable read only when the
+    # metrics are rendered.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.callbacks = {}  # (name, labels) -> (kind, fn)
+        self.histograms = {}
+        self.process = psutil.Process()
+        self.register_callback("process_cpu_percent", "gauge", lambda: self.process.cpu_percent(interval=None))
+        self.register_callback("process_resident_memory_bytes", "gauge", lambda: self.process.memory_info().rss)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_callback(self, name, kind, fn, **labels):
+        # kind is 'gauge' or 'counter' (e.g. a queue's running drop count)
+        with self.lock:
+            self.callbacks[(name, tuple(sorted(labels.items())))] = (kind, fn)
+
+    def collect(self):
+        # (name, kind, labels, value) for every scalar metric
+        with self.lock:
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            callbacks = list(self.callbacks.items())
+        samples = [(name, "counter", labels, value) for (name, labels), value in counters]
+        samples += [(name, "gauge", labels, value) for (name, labels), value in gauges]
+        for (name, labels), (kind, fn) in callbacks:
+            try:
+                samples.append((name, kind, labels, fn()))
+            except Exception:
+                pass  # Source already gone (e.g. a closed queue or exited process)
+        return samples
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+        typed = set()
+        for name, kind, labels, value in sorted(self.collect(), key=lambda s: (s[0], s[2])):
+            metric = f"cheatshield_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} {kind}")
+                typed.add(metric)
+            lines.append(f"{metric}{label_text(labels)} {float(value)}")
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            for (name, labels), histogram in histograms:
+                metric = f"cheatshield_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{label_text(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{metric}_sum{label_text(labels)} {histogram.sum}")
+                lines.append(f"{metric}_count{label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def overlay_lines(self):
+        # Short human-readable summary for the monitoring window
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            for (name, labels), histogram in histograms:
+                if name != "stage_seconds":
+                    continue
+                stage = dict(labels).get("stage", "")
+                p90 = histogram.quantile(0.9)
+                lines.append(f"{stage}: {histogram.last * 1000:.0f} ms (p90 <{p90 * 1000:.0f}) x{histogram.count}")
+        for name, _, labels, value in self.collect():
+            if name == "process_cpu_percent":
+                lines.append(f"CPU {value:.0f}%")
+            elif name == "process_resident_memory_bytes":
+                lines.append(f"RSS {value / (1024 * 1024):.0f} MB")
+            elif name in ("queue_depth", "frames_dropped_total"):
+                lines.append(f"{name} {dict(labels).get('queue', '')}: {value:.0f}")
+        return lines
+
+
+class MetricsServer:
+    # Serves GET /metrics from a daemon thread; bound to localhost by default
+    def __init__(self, registry, port, host="127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+default_registry = None
+default_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    global default_registry
+    with default_registry_lock:
+        if default_registry is None:
+            default_registry = MetricsRegistry()
+        return default_registry
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.utils import debug
+
+# Where downloaded models (YAMNet) are kept and where checksums are recorded.
+# CHEATSHIELD_OFFLINE=1 never touches the network and fails fast on a cache miss.
+CACHE_DIR = os.environ.get("CHEATSHIELD_MODEL_CACHE", os.path.join("models", "cache"))
+OFFLINE = os.environ.get("CHEATSHIELD_OFFLINE", "0") == "1"
+
+
+class ModelCacheError(RuntimeError):
+    pass
+
+
+def file_digest(path, digest=None):
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest
+
+
+def path_checksum(path):
+    # sha256 of a file, or of every file (with its relative name) under a directory
+    if os.path.isfile(path):
+        return file_digest(path).hexdigest()
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            digest.update(os.path.relpath(full, path).replace(os.sep, "/").encode())
+            file_digest(full, digest)
+    return digest.hexdigest()
+
+
+class ModelCache:
+    # On-disk model cache with a manifest of sha256 checksums. Remote models are
+    # downloaded once into the cache and loaded from disk afterwards; local
+    # weights are checksummed on first use and verified on every later start.
+    def __init__(self, cache_dir=CACHE_DIR, offline=OFFLINE):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.manifest = self.read_manifest()
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def register(self, name, path, source=None):
+        entry = {"path": path, "sha256": path_checksum(path), "mtime": os.path.getmtime(path), "source": source}
+        with self.lock:
+            self.manifest[name] = entry
+            self.save_manifest()
+        return entry
+
+    def verify(self, name):
+        entry = self.manifest.get(name)
+        if entry is None or not os.path.exists(entry["path"]):
+            return False
+        return path_checksum(entry["path"]) == entry["sha256"]
+
+    def resolve_hub(self, name, handle):
+        # Local path of a TF Hub model, downloading it into the cache only on a miss
+        entry = self.manifest.get(name)
+        if entry is None or entry.get("source") != handle:
+            # A detector worker process may have cached it since the manifest was read
+            with self.lock:
+                self.manifest.update(self.read_manifest())
+            entry = self.manifest.get(name)
+        if entry is not None and entry.get("source") == handle:
+            if self.verify(name):
+                return entry["path"]
+            debug(f"Cached model '{name}' failed checksum validation")
+            shutil.rmtree(entry["path"], ignore_errors=True)
+        if self.offline:
+            raise ModelCacheError(f"Model '{name}' is not cached and offline mode is enabled")
+
+        import tensorflow_hub as hub
+
+        # TF Hub downloads into TFHUB_CACHE_DIR; point it at our cache
+        os.environ["TFHUB_CACHE_DIR"] = os.path.join(self.cache_dir, "tfhub")
+        path = hub.resolve(handle)
+        self.register(name, path, source=handle)
+        return path
+
+    def checked_file(self, name, path):
+        # Validate local weights against the recorded checksum. A file whose
+        # modification time changed is treated as an intentional update and
+        # re-registered; same mtime with different content means corruption.
+        if not os.path.exists(path):
+            raise ModelCacheError(f"Model file '{path}' for '{name}' does not exist")
+        entry = self.manifest.get(name)
+        if entry is None or entry["path"] != path or entry["mtime"] != os.path.getmtime(path):
+            self.register(name, path)
+        elif not self.verify(name):
+            raise ModelCacheError(f"Model file '{path}' for '{name}' failed checksum validation")
+        return path
+
+
+default_cache = None
+default_cache_lock = threading.Lock()
+
+
+def get_model_cache():
+    # Shared by the loader threads, so creation is guarded
+    global default_cache
+    with default_cache_lock:
+        if default_cache is None:
+            default_cache = ModelCache()
+        return default_cache
+
+
+class ModelLoader:
+    # Loads detectors concurrently in the background. on_ready(name, detector,
+    # seconds) or on_error(name, exception) is called from the loader thread as
+    # each one finishes, so callers can bring detectors online one at a time.
+    # A failure inside on_ready (e.g. no microphone for the audio stream) is
+    # reported through on_error as well.
+    def __init__(self, on_ready, on_error=None, max_workers=3):
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-loader")
+        self.load_times = {}
+
+    def submit(self, name, factory):
+        return self.executor.submit(self.load, name, factory)
+
+    def load(self, name, factory):
+        start = time.monotonic()
+        try:
+            detector = factory()
+        except Exception as e:
+            print(f"Error loading {name} model: {e}")
+            if self.on_error is not None:
+                self.on_error(name, e)
+            return None
+        seconds = time.monotonic() - start
+        self.load_times[name] = seconds
+        debug(f"Loaded {name} model in {seconds:.1f}s")
+        try:
+            self.on_ready(name, detector, seconds)
+        except Exception as e:
+            print(f"Error starting {name} detector: {e}")
+            if self.on_error is not None:
+                self.on_error(name, e)
+            return None
+        return detector
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,62 @@
+import time
+
+import cv2
+import numpy as np
+
+from modules.frame import as_bgr
+
+
+class MotionGate:
+    # Cheap pre-filter in front of a detector. Each frame is reduced to a tiny
+    # grayscale thumbnail and compared with the thumbnail of the frame the
+    # detector last ran on. If the mean absolute difference and the fraction of
+    # changed pixels both stay under their thresholds, the scene is treated as
+    # unchanged and the previous detection result can be reused.
+    def __init__(self, size=(32, 24), threshold=6.0, pixel_threshold=25, changed_fraction=0.02,
+                 max_skip_seconds=5.0, clock=time.monotonic):
+        self.size = size
+        self.threshold = threshold  # Mean absolute difference (0-255) that counts as a scene change
+        self.pixel_threshold = pixel_threshold  # Per-pixel difference that marks a pixel as changed
+        self.changed_fraction = changed_fraction  # Fraction of changed pixels that counts as motion
+        self.max_skip_seconds = max_skip_seconds  # Force a fresh inference at least this often
+        self.clock = clock
+        self.reference = None
+        self.reference_time = 0.0
+        self.checked = 0
+        self.skipped = 0
+        self.last_difference = 0.0
+
+    def thumbnail(self, frame):
+        frame = as_bgr(frame)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, frame, now=None):
+        # True when the detector should run; the reference is updated on every True
+        now = self.clock() if now is None else now
+        self.checked += 1
+        thumb = self.thumbnail(frame)
+
+        if self.reference is None or now - self.reference_time >= self.max_skip_seconds:
+            changed = True
+        else:
+            diff = np.abs(thumb - self.reference)
+            self.last_difference = float(diff.mean())
+            changed = (self.last_difference > self.threshold or
+                       np.count_nonzero(diff > self.pixel_threshold) > self.changed_fraction * diff.size)
+
+        if changed:
+            self.reference = thumb
+            self.reference_time = now
+        else:
+            self.skipped += 1
+        return changed
+
+    def reset(self):
+        self.reference = None
+
+    def skip_rate(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def stats(self):
+        return {"checked": self.checked, "skipped": self.skipped, "skip_rate": self.skip_rate()}
@@ -0,0 +1,253 @@
+import argparse
+import glob
+import importlib.util
+import os
+
+import cv2
+import numpy as np
+
+
+# Inference backends for ObjectDetector. Every backend exposes
+# predict(images_rgb, img_size=None) -> list of (N, 6) float32 arrays
+# [x1, y1, x2, y2, conf, cls] in the coordinates of the input images, so the
+# detector's annotation and alert logic does not depend on which runtime
+# produced the boxes. img_size overrides the network input side (a multiple
+# of 32) where the runtime allows it, so small crops run at a smaller size.
+
+
+def letterbox(img, size=640, color=114):
+    # Resize keeping aspect ratio and pad to a fixed size x size input (as YOLOv5 does)
+    h, w = img.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    out = np.full((size, size, 3), color, dtype=np.uint8)
+    out[top:top + new_h, left:left + new_w] = resized
+    return out, ratio, (left, top)
+
+
+def preprocess(images_rgb, size=640):
+    # Stack letterboxed RGB images into one NCHW float32 batch in [0, 1]
+    batch = np.empty((len(images_rgb), 3, size, size), dtype=np.float32)
+    transforms = []
+    for i, img in enumerate(images_rgb):
+        boxed, ratio, pad = letterbox(img, size)
+        batch[i] = boxed.transpose(2, 0, 1)
+        transforms.append((ratio, pad, img.shape[:2]))
+    batch *= 1.0 / 255.0
+    return batch, transforms
+
+
+def nms(boxes, scores, iou_thres):
+    # Greedy NMS; each iteration suppresses all overlapping boxes at once
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(raw, transform, conf_thres=0.25, iou_thres=0.45, max_det=300):
+    # raw: (num_anchors, 5 + num_classes) YOLOv5 head output for one image
+    # (cx, cy, w, h, objectness, class scores...). Returns (N, 6) detections.
+    raw = raw[raw[:, 4] > conf_thres]
+    if not raw.shape[0]:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    class_scores = raw[:, 5:] * raw[:, 4:5]
+    cls = class_scores.argmax(axis=1)
+    conf = class_scores[np.arange(len(cls)), cls]
+    mask = conf > conf_thres
+    raw, cls, conf = raw[mask], cls[mask], conf[mask]
+    if not raw.shape[0]:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    boxes = np.empty((raw.shape[0], 4), dtype=np.float32)
+    boxes[:, :2] = raw[:, :2] - raw[:, 2:4] / 2
+    boxes[:, 2:] = raw[:, :2] + raw[:, 2:4] / 2
+
+    # Offset boxes by class so one NMS pass never suppresses across classes
+    keep = nms(boxes + cls[:, None] * 4096.0, conf, iou_thres)[:max_det]
+    boxes, conf, cls = boxes[keep], conf[keep], cls[keep]
+
+    ratio, (pad_x, pad_y), (h, w) = transform
+    boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / ratio, 0, w)
+    boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / ratio, 0, h)
+    return np.concatenate((boxes, conf[:, None], cls[:, None].astype(np.float32)), axis=1)
+
+
+def onnx_unavailable(onnx_path):
+    # Why the ONNX backend cannot run here (missing runtime or export), or None
+    if importlib.util.find_spec('onnxruntime') is None:
+        return "onnxruntime is not installed"
+    if not os.path.exists(onnx_path):
+        return f"'{onnx_path}' does not exist (export it with python -m modules.object_backends)"
+    return None
+
+
+class TorchBackend:
+    # The original path: the yolov5 package on PyTorch
+    name = "torch"
+
+    def __init__(self, weights_path, conf_thres, iou_thres, img_size=640):
+        import torch
+        from yolov5 import YOLOv5  # Import the official YOLOv5 package
+
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model = YOLOv5(model_path=weights_path, device=self.device)
+        self.model.conf = conf_thres  # Set default confidence threshold
+        self.model.iou = iou_thres    # Set IoU threshold
+        self.img_size = img_size
+
+    def set_thresholds(self, conf_thres, iou_thres):
+        self.model.conf = conf_thres
+        self.model.iou = iou_thres
+
+    def predict(self, images_rgb, img_size=None):
+        results = self.model.predict(images_rgb, size=img_size or self.img_size)
+        return [pred.cpu().numpy() for pred in results.pred]
+
+
+class OnnxBackend:
+    # ONNX Runtime on CPU (FP32 or INT8-quantized export). Uses the OpenVINO
+    # execution provider when onnxruntime-openvino is installed and requested.
+    name = "onnx"
+
+    def __init__(self, onnx_path, conf_thres, iou_thres, img_size=640, num_threads=None, use_openvino=False):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        providers = ['CPUExecutionProvider']
+        if use_openvino and 'OpenVINOExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'OpenVINOExecutionProvider')
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        # Exports with a fixed batch dimension of 1 are run image by image
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.fixed_batch = isinstance(batch_dim, int)
+        # Exports with a fixed input size ignore per-call sizes
+        self.fixed_size = isinstance(self.session.get_inputs()[0].shape[2], int)
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.img_size = img_size
+
+    def set_thresholds(self, conf_thres, iou_thres):
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+
+    def predict(self, images_rgb, img_size=None):
+        size = self.img_size if self.fixed_size or not img_size else img_size
+        batch, transforms = preprocess(images_rgb, size)
+        if self.fixed_batch:
+            raw = np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                                  for i in range(len(batch))])
+        else:
+            raw = self.session.run(None, {self.input_name: batch})[0]
+        return [postprocess(raw[i], transforms[i], self.conf_thres, self.iou_thres)
+                for i in range(len(transforms))]
+
+
+class IsolatedBackend:
+    # Runs any of the above in a separate detector process (see process_workers);
+    # frames cross the boundary through shared memory
+    name = "isolated"
+
+    def __init__(self, options, threads=1, affinity=None):
+        from modules.process_workers import DetectorProcess
+
+        self.process = DetectorProcess("objects", options, threads, affinity)
+        self.process.start()
+
+    def predict(self, images_rgb, img_size=None):
+        return [self.process.call(np.ascontiguousarray(img), img_size=img_size) for img in images_rgb]
+
+    def close(self):
+        self.process.stop()
+
+
+def export_onnx(weights_path, img_size=640, dynamic=True):
+    # Export best.pt to ONNX next to the weights using the yolov5 package exporter
+    from yolov5 import export
+
+    export.run(weights=weights_path, include=('onnx',), imgsz=(img_size, img_size),
+               device='cpu', dynamic=dynamic, simplify=False)
+    return os.path.splitext(weights_path)[0] + '.onnx'
+
+
+def load_calibration_frames(source, limit=200):
+    # Calibration frames come from a directory of images or a recorded video (BGR)
+    frames = []
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, '*'))):
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+            if len(frames) >= limit:
+                break
+    else:
+        cap = cv2.VideoCapture(source)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+def quantize_int8(onnx_path, calibration_frames, output_path=None, img_size=640):
+    # Static post-training INT8 quantization calibrated on sample exam frames
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    output_path = output_path or os.path.splitext(onnx_path)[0] + '-int8.onnx'
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.frames = iter(calibration_frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            batch, _ = preprocess([cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)], img_size)
+            return {self.input_name: batch}
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    quantize_static(onnx_path, output_path, FrameReader(input_name), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the YOLOv5 weights to ONNX (optionally INT8)")
+    parser.add_argument("--weights", default=r"models\best.pt")
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="Also write a statically quantized INT8 model")
+    parser.add_argument("--calibration", help="Directory of images or a video file used for INT8 calibration")
+    parser.add_argument("--calibration-frames", type=int, default=200)
+    args = parser.parse_args()
+
+    onnx_path = export_onnx(args.weights, args.img_size)
+    print(f"Exported {onnx_path}")
+    if args.int8:
+        if not args.calibration:
+            parser.error("--int8 needs --calibration frames")
+        frames = load_calibration_frames(args.calibration, args.calibration_frames)
+        print(f"Calibrating on {len(frames)} frames")
+        print(f"Exported {quantize_int8(onnx_path, frames, img_size=args.img_size)}")
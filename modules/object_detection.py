@@ -1,56 +1,154 @@
+import os
+
 import cv2
-import torch
 import numpy as np
-from yolov5 import YOLOv5  # Import the official YOLOv5 package
+
+from modules.object_backends import TorchBackend, OnnxBackend, IsolatedBackend, onnx_unavailable
+from modules.frame import as_rgb
+from modules.utils import debug
+from modules.model_cache import get_model_cache
+from modules.metrics import get_metrics
+from modules.roi import inference_size
+from modules.config import ObjectsConfig
 
 class ObjectDetector:
-    def __init__(self):
-        # Path to your custom-trained weights
-        self.weights_path = r"models\best.pt"
-        self.conf_thres = 0.2  # Lowered default confidence threshold for better book detection
-        self.mobile_conf_thres = 0.4  # Lowered confidence threshold for better mobile phone detection
-        self.iou_thres = 0.45    # IoU threshold for NMS
-        self.classes = ['book', 'mobile phone', 'laptop']
+    def __init__(self, backend='torch', onnx_path=None, num_threads=None, use_openvino=False,
+                 isolated=False, threads=1, affinity=None, weights_path=r"models\best.pt", classes=None,
+                 model_name='yolov5', config=None):
+        # Path to your custom-trained weights; `classes` lists the head's classes in
+        # index order and `model_name` is the weights' model cache entry.
+        # Thresholds come from `config` (an ObjectsConfig) and can be changed
+        # later with configure().
+        self.weights_path = weights_path
+        self.model_name = model_name
+        self.backend = None
+        self.configure(config or ObjectsConfig())
+        self.classes = classes or ['book', 'mobile phone', 'laptop']
+        self.mobile_class = self.classes.index('mobile phone')
         
-        # Initialize the YOLOv5 model using the official package
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model = YOLOv5(model_path=self.weights_path, device=self.device)
-        self.model.conf = self.conf_thres  # Set default confidence threshold
-        self.model.iou = self.iou_thres    # Set IoU threshold
+        # 'torch' uses the official YOLOv5 package; 'onnx' runs an exported (optionally
+        # INT8) model on ONNX Runtime without importing PyTorch at all. With
+        # `isolated`, either one runs in its own process with `threads` intra-op
+        # threads pinned to the `affinity` CPUs. Without the runtime or the
+        # exported model, 'onnx' falls back to 'torch' rather than leaving the
+        # test without object detection.
+        if backend == 'onnx':
+            onnx_path = onnx_path or os.path.splitext(self.weights_path)[0] + '.onnx'
+            reason = onnx_unavailable(onnx_path)
+            if reason is not None:
+                print(f"Warning: ONNX backend unavailable: {reason}; using the PyTorch backend")
+                backend = 'torch'
+        if isolated:
+            self.backend = IsolatedBackend({'backend': backend, 'onnx_path': onnx_path, 'num_threads': num_threads,
+                                            'use_openvino': use_openvino, 'weights_path': weights_path,
+                                            'model_name': model_name, 'config': config}, threads, affinity)
+            self.device = 'cpu'
+        elif backend == 'onnx':
+            onnx_path = get_model_cache().checked_file(f'{model_name}-onnx', onnx_path)
+            self.backend = OnnxBackend(onnx_path, self.conf_thres, self.iou_thres,
+                                       num_threads=num_threads, use_openvino=use_openvino)
+            self.device = 'cpu'
+        else:
+            # Weights are checksummed on first use and verified on later starts
+            get_model_cache().checked_file(model_name, self.weights_path)
+            self.backend = TorchBackend(self.weights_path, self.conf_thres, self.iou_thres)
+            self.device = self.backend.device
+            self.model = self.backend.model
         self.alerts = {"objects": ""}
 
+    def configure(self, config):
+        # Thresholds only; the loaded model is kept. An isolated backend keeps
+        # its start-up thresholds, but raised confidence thresholds still apply
+        # through filter_detections.
+        self.conf_thres = config.conf_thres
+        self.mobile_conf_thres = config.mobile_conf_thres
+        self.iou_thres = config.iou_thres
+        if hasattr(self.backend, 'set_thresholds'):
+            self.backend.set_thresholds(self.conf_thres, self.iou_thres)
+
+    def detect(self, frame, roi=None):
+        # Pipeline path: takes a Frame (or BGR array), reuses its shared RGB view, draws
+        # nothing and returns the kept (N, 6) detections; alerts are updated as usual.
+        # With roi=(x1, y1, x2, y2) only that region is run, at an input size that
+        # follows the crop, and boxes are mapped back to frame coordinates.
+        rgb = as_rgb(frame)
+        if roi is None:
+            pred = self.predict([rgb])[0]
+        else:
+            x1, y1, x2, y2 = roi
+            crop = rgb[y1:y2, x1:x2]
+            pred = np.array(self.predict([crop], inference_size(crop.shape))[0], dtype=np.float32).reshape(-1, 6)
+            pred[:, [0, 2]] += x1
+            pred[:, [1, 3]] += y1
+        detections = self.filter_detections(pred)
+        self.update_alerts(detections)
+        return detections
+
     def process_image(self, frame):
         # Convert frame to RGB (YOLOv5 expects RGB images)
         img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        # Perform inference using the YOLOv5 model
-        results = self.model.predict(img)
+        # Perform inference using the selected backend
+        pred = self.predict([img])[0]
+        return self.annotate(frame, pred)
+
+    def process_batch(self, frames):
+        # Run one forward pass over several frames (e.g. from different candidates).
+        # Returns a list of (annotated frame, alert message) in input order.
+        imgs = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+        preds = self.predict(imgs)
         
-        # Extract detections
-        h, w = frame.shape[:2]
+        outputs = []
+        for frame, pred in zip(frames, preds):
+            frame = self.annotate(frame, pred)
+            outputs.append((frame, self.alerts["objects"]))
+        return outputs
+
+    def predict(self, images_rgb, img_size=None):
+        metrics = get_metrics()
+        with metrics.timer("inference_seconds", model="objects"):
+            preds = self.backend.predict(images_rgb, img_size)
+        metrics.inc("inferences_total", len(images_rgb), model="objects")
+        return preds
+
+    def filter_detections(self, pred):
+        # pred: (N, 6) [x1, y1, x2, y2, conf, cls]. Applies the higher mobile phone
+        # threshold to the whole array at once.
+        pred = np.asarray(pred, dtype=np.float32).reshape(-1, 6)
+        pred = pred[pred[:, 4] >= self.conf_thres]
+        weak_mobile = (pred[:, 5].astype(int) == self.mobile_class) & (pred[:, 4] < self.mobile_conf_thres)
+        if weak_mobile.any():
+            debug(f"Ignored {int(weak_mobile.sum())} mobile phone detection(s) below {self.mobile_conf_thres}")
+        return pred[~weak_mobile]
+
+    def annotate(self, frame, pred):
+        detections = self.filter_detections(pred)
+        self.draw(frame, detections)
+        self.update_alerts(detections)
+        return frame
+
+    def draw(self, canvas, detections, scale=(1.0, 1.0), rgb=False):
+        # Draw bounding box and label for each detection; `scale` maps frame
+        # coordinates onto a resized canvas and `rgb` swaps the BGR colours
+        sx, sy = scale
+        for x1, y1, x2, y2, conf, cls in detections:
+            x1, y1, x2, y2 = int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy)
+            class_name = self.classes[int(cls)]
+            color = (0, 255, 0) if class_name != 'mobile phone' else (0, 0, 255)
+            if rgb:
+                color = color[::-1]
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), color, 2)
+            label = f"{class_name} {conf:.2f}"
+            cv2.putText(canvas, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        return canvas
+
+    def update_alerts(self, detections):
         suspicious_objects = []
-        
-        # Process the results
-        if results.pred[0].shape[0] > 0:  # If there are detections
-            for det in results.pred[0]:
-                x1, y1, x2, y2, conf, cls = det
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                class_name = self.classes[int(cls)]
-                
-                # Apply higher confidence threshold for mobile phones
-                if class_name == 'mobile phone' and conf < self.mobile_conf_thres:
-                    print(f"Ignored mobile phone detection (Confidence: {conf:.2f} < {self.mobile_conf_thres})")
-                    continue
-                
-                # Draw bounding box and label on the frame
-                color = (0, 255, 0) if class_name != 'mobile phone' else (0, 0, 255)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                label = f"{class_name} {conf:.2f}"
-                cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                
-                print(f"Detected object: {class_name} (Confidence: {conf:.2f})")  # Debug print
-                if class_name in ['mobile phone', 'book', 'laptop']:
-                    suspicious_objects.append(f"{class_name} (Confidence: {conf:.2f})")
+        for x1, y1, x2, y2, conf, cls in detections:
+            class_name = self.classes[int(cls)]
+            debug(f"Detected object: {class_name} (Confidence: {conf:.2f})")
+            if class_name in ['mobile phone', 'book', 'laptop']:
+                suspicious_objects.append(f"{class_name} (Confidence: {conf:.2f})")
 
         # Set alerts if suspicious objects are detected
         if suspicious_objects:
@@ -58,4 +156,7 @@ class ObjectDetector:
         else:
             self.alerts["objects"] = ""
 
-        return frame
\ No newline at end of file
+    def close(self):
+        # Stops the detector process when running isolated
+        if hasattr(self.backend, 'close'):
+            self.backend.close()
@@ -0,0 +1,237 @@
+import collections
+import queue
+import threading
+import time
+
+from modules.scheduler import DetectorScheduler
+from modules.motion_gate import MotionGate
+from modules.frame import Frame
+from modules.metrics import get_metrics
+from modules.roi import desk_region, largest_face
+
+
+class LatestQueue:
+    # Bounded hand-off between pipeline stages. When the queue is full the
+    # oldest item is dropped, so a slow consumer always picks up the most
+    # recent frame instead of working through a backlog.
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            if self.closed:
+                return
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        # Returns None on timeout or once the queue has been closed
+        with self.cond:
+            self.cond.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def get_nowait(self):
+        with self.cond:
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        with self.cond:
+            return len(self.items)
+
+
+class CaptureThread(threading.Thread):
+    # Reads frames from the webcam and fans the same Frame out to the display
+    # and detection queues. The detection worker decides which frames it uses.
+    # `display_queue` may be None when nothing renders a preview (headless).
+    # `on_frame`, if given, also receives every Frame and must not block.
+    def __init__(self, cap, display_queue, detect_queue, on_frame=None):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.display_queue = display_queue
+        self.detect_queue = detect_queue
+        self.on_frame = on_frame
+        self.frame_counter = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+
+            self.frame_counter += 1
+            shared = Frame(frame, self.frame_counter)
+            if self.display_queue is not None:
+                self.display_queue.put(shared)
+            self.detect_queue.put(shared)
+            if self.on_frame is not None:
+                self.on_frame(shared)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class DetectionWorker(threading.Thread):
+    # Runs the object and face detectors off the GUI thread and hands each
+    # result to `on_result` (MonitoringSession.handle_detection).
+    # A DetectorScheduler staggers the two models and adapts their rates;
+    # results from a detector that was skipped are carried forward while
+    # they are still active. With `motion_gating` on, a detector whose scene has
+    # not changed since its last run reuses its previous result instead. With
+    # `object_roi` on, object detection runs on the desk region below the most
+    # recent face instead of the whole frame. When both detectors are views of
+    # one unified model, either schedule runs the shared pass and refreshes both
+    # results.
+    def __init__(self, detect_queue, object_detector, face_detector, on_result, scheduler=None,
+                 object_interval=0.8, face_interval=0.8, motion_gating=True, gate_options=None,
+                 clock=time.monotonic, object_roi=True):
+        super().__init__(daemon=True)
+        self.detect_queue = detect_queue
+        self.object_detector = object_detector
+        self.face_detector = face_detector
+        self.on_result = on_result
+        self.object_roi = object_roi
+        if scheduler is None:
+            scheduler = DetectorScheduler(clock=clock)
+            scheduler.add("objects", object_interval)
+            scheduler.add("faces", face_interval)
+        self.scheduler = scheduler
+        self.gates = {}
+        if motion_gating:
+            self.gates = {name: MotionGate(clock=scheduler.clock, **(gate_options or {}))
+                          for name in ("objects", "faces")}
+        self.settings = queue.SimpleQueue()  # Pending configure() calls
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.apply_settings()
+            # Sleep until a detector is due, then take the freshest frame
+            wait = self.scheduler.next_due() - self.scheduler.clock()
+            if wait > 0:
+                self.stopped.wait(min(wait, 0.2))
+                continue
+
+            frame = self.detect_queue.get(timeout=0.2)
+            if frame is None:
+                continue
+
+            try:
+                result = self.detect(frame)
+            except Exception as e:
+                print(f"Error in detection worker: {e}")
+                continue
+            if result is not None:
+                self.on_result(result)
+
+    def detect(self, frame):
+        self.apply_settings()
+        name = self.scheduler.due()
+        if name is None:
+            return None
+
+        detector = self.object_detector if name == "objects" else self.face_detector
+        if detector is None:
+            # Model still loading in the background; try again next interval
+            self.scheduler.skip(name)
+            return None
+
+        gate = self.gates.get(name)
+        if gate is not None and not gate.changed(frame):
+            # Static scene: keep the previous result alive without running the model
+            self.scheduler.hold(name, self.scheduler.schedules[name].held_value)
+            self.scheduler.skip(name)
+            get_metrics().inc("gated_total", detector=name)
+            return self.result(frame, name, gated=True)
+
+        # Detectors read the shared Frame and draw nothing; the window overlays
+        # the returned boxes on its own display buffer
+        start = time.monotonic()
+        sources = (name,)
+        try:
+            unified = getattr(detector, "unified", None)
+            if unified is not None:
+                detections, faces = unified.detect_all(frame)
+                self.scheduler.hold("objects", (unified.model.alerts["objects"], detections))
+                self.scheduler.hold("faces", faces)
+                # The other detector's result is fresh too; push its next run back
+                self.scheduler.skip("faces" if name == "objects" else "objects")
+                sources = ("objects", "faces")
+            elif name == "objects":
+                roi = None
+                if self.object_roi:
+                    roi = desk_region(largest_face(self.scheduler.held("faces")), frame.shape)
+                detections = self.object_detector.detect(frame, roi=roi)
+                self.scheduler.hold("objects", (self.object_detector.alerts["objects"], detections))
+            else:
+                faces = self.face_detector.locate(frame)
+                self.scheduler.hold("faces", faces)
+        finally:
+            # Reschedule even on failure so a broken detector cannot spin the worker
+            elapsed = time.monotonic() - start
+            self.scheduler.record(name, elapsed)
+            get_metrics().observe("stage_seconds", elapsed, stage=name)
+
+        return self.result(frame, name, sources=sources)
+
+    def result(self, frame, ran, gated=False, sources=None):
+        objects, detections = self.scheduler.held("objects") or ("", None)
+        faces = self.scheduler.held("faces")
+        return {
+            "index": frame.index,
+            "frame": frame,
+            "ran": ran,
+            "gated": gated,  # The held result of `ran` was reused for an unchanged scene
+            "sources": sources or (ran,),  # Detectors reported by this result (both for a unified pass)
+            "objects": objects,
+            "detections": detections,
+            "faces": faces,
+            "num_faces": None if faces is None else len(faces),  # None when no recent face result
+        }
+
+    def configure(self, object_interval, face_interval, object_roi, gate_threshold):
+        # Runtime changes from a configuration reload; the models are untouched.
+        # Safe from any thread: the scheduler and gates are not locked, so the
+        # change is queued and applied by the thread that runs detect().
+        self.settings.put((object_interval, face_interval, object_roi, gate_threshold))
+
+    def apply_settings(self):
+        while True:
+            try:
+                object_interval, face_interval, object_roi, gate_threshold = self.settings.get_nowait()
+            except queue.Empty:
+                return
+            self.scheduler.set_interval("objects", object_interval)
+            self.scheduler.set_interval("faces", face_interval)
+            self.object_roi = object_roi
+            for gate in self.gates.values():
+                gate.threshold = gate_threshold
+
+    def gate_stats(self):
+        # Skip counters per detector plus the inference time they saved (seconds)
+        stats = {}
+        for name, gate in self.gates.items():
+            stats[name] = gate.stats()
+            avg = self.scheduler.schedules[name].avg_inference or 0.0
+            stats[name]["saved_seconds"] = gate.skipped * avg
+        return stats
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import psutil
+
+from modules.utils import debug
+
+
+class DetectorProcessError(RuntimeError):
+    pass
+
+
+# What the worker process does with each array it receives, per detector kind.
+# Only the model call crosses the process boundary; thresholds, tracking,
+# alerts and drawing stay in the parent.
+def call_objects(detector, array, img_size=None):
+    # img_size: network input side for ROI crops, as for the in-process backends
+    return detector.backend.predict([array], img_size)[0]
+
+
+def call_faces(detector, array):
+    return detector.detect_raw(array)
+
+
+def call_audio(detector, array):
+    return detector.run_model(array)
+
+
+CHILD_CALLS = {"objects": call_objects, "faces": call_faces, "audio": call_audio}
+
+
+def configure_threads(kind, options, threads):
+    # Give this process its own intra-op/inter-op budget before any framework
+    # creates its thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    if kind == "objects" and options.get("backend", "torch") == "torch":
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    elif kind == "audio" or (kind == "faces" and options.get("backend", "mtcnn") == "mtcnn"):
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def build_detector(kind, options):
+    # Imported here: the parent imports this module from the detector modules
+    if kind == "objects":
+        from modules.object_detection import ObjectDetector
+        return ObjectDetector(**options)
+    if kind == "faces":
+        from modules.face_detection import FaceDetector
+        return FaceDetector(**options)
+    from modules.audio_detection import AudioDetector
+    return AudioDetector(**options)
+
+
+def worker_main(kind, options, threads, affinity, conn):
+    # Entry point of the detector process
+    if affinity:
+        try:
+            psutil.Process().cpu_affinity(affinity)
+        except (AttributeError, psutil.Error, ValueError):
+            pass  # Not supported on this platform (e.g. macOS)
+    configure_threads(kind, options, threads)
+    try:
+        detector = build_detector(kind, options)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", os.getpid()))
+
+    call = CHILD_CALLS[kind]
+    segment = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "stop":
+            break
+
+        _, name, shape, dtype, options = message
+        if segment is None or segment.name != name:
+            if segment is not None:
+                segment.close()
+            segment = shared_memory.SharedMemory(name=name)
+        # Read-only view straight onto the parent's buffer: no copy on this side
+        array = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        array.flags.writeable = False
+        try:
+            conn.send(("ok", call(detector, array, **options)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        del array
+    if segment is not None:
+        segment.close()
+
+
+class DetectorProcess:
+    # Runs one detector model in its own process. Inputs are written into a
+    # shared memory segment that the worker maps directly; only the (small)
+    # result is pickled back over a pipe. If the worker dies or hangs it is
+    # killed and restarted on the next call, up to `max_restarts` times.
+    def __init__(self, kind, options=None, threads=1, affinity=None, load_timeout=300.0, call_timeout=10.0,
+                 max_restarts=5):
+        self.kind = kind
+        self.options = options or {}
+        self.threads = threads
+        self.affinity = affinity
+        self.load_timeout = load_timeout
+        self.call_timeout = call_timeout
+        self.max_restarts = max_restarts
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.conn = None
+        self.segment = None
+        self.restarts = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=worker_main, name=f"detector-{self.kind}", daemon=True,
+                                            args=(self.kind, self.options, self.threads, self.affinity, child_conn))
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        if not self.conn.poll(self.load_timeout):
+            self.kill()
+            raise DetectorProcessError(f"{self.kind} worker did not load within {self.load_timeout}s")
+        status, value = self.conn.recv()
+        if status != "ready":
+            self.kill()
+            raise DetectorProcessError(f"{self.kind} worker failed to load: {value}")
+        debug(f"{self.kind} worker running as pid {value} with {self.threads} thread(s), cpus {self.affinity}")
+
+    def ensure_running(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        if self.process is not None:
+            if self.restarts >= self.max_restarts:
+                raise DetectorProcessError(f"{self.kind} worker crashed {self.restarts} times; giving up")
+            self.restarts += 1
+            print(f"{self.kind} worker exited (code {self.process.exitcode}); restarting")
+            self.kill()
+        self.start()
+
+    def input_view(self, array):
+        # Shared segment sized for the largest input seen so far
+        if self.segment is None or self.segment.size < array.nbytes:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment.unlink()
+            self.segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        return np.ndarray(array.shape, dtype=array.dtype, buffer=self.segment.buf)
+
+    def call(self, array, **options):
+        # `options` are passed to the kind's call function (e.g. img_size)
+        with self.lock:
+            self.ensure_running()
+            view = self.input_view(array)
+            view[...] = array
+            del view
+            try:
+                self.conn.send(("call", self.segment.name, array.shape, array.dtype.str, options))
+                if not self.conn.poll(self.call_timeout):
+                    raise DetectorProcessError(f"{self.kind} worker timed out after {self.call_timeout}s")
+                status, value = self.conn.recv()
+            except (EOFError, OSError, DetectorProcessError):
+                # Crashed or hung: kill it now, the next call restarts it
+                self.kill(keep_record=True)
+                raise DetectorProcessError(f"{self.kind} worker crashed during a call")
+            self.calls += 1
+            if status != "ok":
+                raise DetectorProcessError(f"{self.kind} worker error: {value}")
+            return value
+
+    def kill(self, keep_record=False):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join(1.0)
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if not keep_record:
+            self.process = None
+
+    def stop(self):
+        with self.lock:
+            if self.process is not None and self.process.is_alive():
+                try:
+                    self.conn.send(("stop",))
+                except OSError:
+                    pass
+                self.process.join(2.0)
+            self.kill()
+            if self.segment is not None:
+                self.segment.close()
+                self.segment.unlink()
+                self.segment = None
+
+
+def plan_workers(kinds, cpu_count=None):
+    # Split the cores between detector processes: each kind gets a contiguous
+    # block of CPUs and an intra-op budget equal to its block size
+    cpu_count = cpu_count or psutil.cpu_count(logical=True) or 1
+    share = max(1, cpu_count // len(kinds))
+    plan = {}
+    for i, kind in enumerate(kinds):
+        first = (i * share) % cpu_count
+        cores = [(first + j) % cpu_count for j in range(share)]
+        plan[kind] = {"threads": share, "affinity": cores}
+    return plan
@@ -0,0 +1,247 @@
+import argparse
+import json
+import time
+import wave
+
+import cv2
+import numpy as np
+import psutil
+
+from modules.object_detection import ObjectDetector
+from modules.face_detection import FaceDetector
+from modules.audio_detection import AudioDetector
+from modules.frame import Frame
+from modules.pipeline import DetectionWorker
+from modules.temporal import TemporalAggregator, detection_observations, event_warning
+from modules.unified_detection import UnifiedDetector
+from modules.config import load_config
+from modules.violations import ViolationPolicy
+
+
+def load_wav(path, sample_rate=16000):
+    # Mono float32 samples in [-1, 1] at `sample_rate` (linear resampling if needed)
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        data = wav.readframes(wav.getnframes())
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    audio = np.frombuffer(data, dtype=dtype).astype(np.float32)
+    if width == 1:
+        audio = (audio - 128.0) / 128.0
+    else:
+        audio /= float(np.iinfo(dtype).max)
+    audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        positions = np.arange(0, len(audio), rate / sample_rate)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        summary = {}
+        for stage, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            summary[stage] = {
+                "count": len(ms),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p90_ms": float(np.percentile(ms, 90)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+                "total_s": float(ms.sum() / 1000),
+            }
+        return summary
+
+
+class ReplayHarness:
+    # Headless stand-in for MonitoringWindow: feeds a recorded video (and
+    # optionally a WAV file) through the same detectors, scheduler, motion gate
+    # and violation policy, either paced in real time or as fast as possible.
+    # In fast mode the scheduler, gates and cooldowns run on the media clock so
+    # the violation timeline matches a real-time run. Settings come from
+    # `config` (loaded like the window's when not given).
+    def __init__(self, video_path, audio_path=None, realtime=False, max_warnings=None, cooldown=None,
+                 stop_on_termination=True, object_detector=None, face_detector=None, audio_detector=None,
+                 config=None):
+        config = config or load_config()
+        self.config = config
+        self.video_path = video_path
+        self.audio_path = audio_path
+        self.realtime = realtime
+        self.stop_on_termination = stop_on_termination
+        self.media_time = 0.0
+        clock = time.monotonic if realtime else (lambda: self.media_time)
+
+        # Same detector configuration as MonitoringWindow
+        self.object_detector = object_detector or ObjectDetector(backend=config.objects.backend,
+                                                                 config=config.objects)
+        if face_detector is None:
+            face_detector = FaceDetector(backend=config.faces.backend, tracking=True,
+                                         redetect_every=config.faces.redetect_every,
+                                         input_width=config.faces.input_width or None)
+            face_detector.configure(config.faces)
+        self.face_detector = face_detector
+        self.worker = DetectionWorker(None, self.object_detector, self.face_detector, None,
+                                      object_interval=config.objects.interval, face_interval=config.faces.interval,
+                                      motion_gating=config.motion.gating,
+                                      gate_options={"threshold": config.motion.threshold}, clock=clock,
+                                      object_roi=config.objects.roi)
+        self.audio_detector = None
+        if audio_path:
+            self.audio_detector = audio_detector or AudioDetector(sample_rate=16000, window_seconds=0.975,
+                                                                  monitored_classes=config.audio.thresholds,
+                                                                  pooling=config.audio.pooling, vad=config.audio.vad,
+                                                                  hop_seconds=0.48, latency=1.0)
+        violations = config.violations
+        self.policy = ViolationPolicy(max_warnings or violations.max_warnings, cooldown or violations.cooldown,
+                                      clock=lambda: self.media_time)
+        self.event_engine = TemporalAggregator(mode='ema', alpha=violations.alpha,
+                                               on_threshold=violations.on_threshold,
+                                               off_threshold=violations.off_threshold,
+                                               repeat=self.policy.cooldown)
+        self.timer = StageTimer()
+        self.timeline = []
+        self.process = psutil.Process()
+        self.peak_rss = 0
+
+    def record(self, message, detector, confidence, kind=None):
+        decision = self.policy.submit(message, now=self.media_time, kind=kind or detector)
+        if decision is None:
+            return False
+        self.timeline.append({
+            "time": round(self.media_time, 3),
+            "detector": detector,
+            "message": message,
+            "confidence": confidence,
+            "counted": decision["counted"],
+            "warning_count": decision["warning_count"],
+        })
+        return decision["terminate"]
+
+    def run(self):
+        cap = cv2.VideoCapture(self.video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        audio = None
+        audio_fed = 0
+        last_audio_score = 0.0
+        if self.audio_detector is not None:
+            audio = load_wav(self.audio_path, self.audio_detector.sample_rate)
+            self.audio_detector.next_window_start = self.audio_detector.ring.total_written
+
+        frames = 0
+        terminated = False
+        start = time.monotonic()
+        while not terminated:
+            decode_start = time.perf_counter()
+            ret, buffer = cap.read()
+            if not ret:
+                break
+            self.timer.add("decode", time.perf_counter() - decode_start)
+            self.media_time = frames / fps
+            frames += 1
+            if self.realtime:
+                delay = start + self.media_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            frame = Frame(buffer, frames, self.media_time)
+            detect_start = time.perf_counter()
+            result = self.worker.detect(frame)
+            if result is not None:
+                self.timer.add("gated" if result["gated"] else result["ran"], time.perf_counter() - detect_start)
+                for source in result["sources"]:
+                    source, observations = detection_observations(result, self.object_detector.classes, source)
+                    for event in self.event_engine.update(source, self.media_time, observations):
+                        if event["type"] in ("start", "repeat"):
+                            message, detector = event_warning(event)
+                            terminated = self.record(message, detector, event["confidence"],
+                                                     f"{source}:{event['label']}") or terminated
+
+            if audio is not None:
+                # Feed audio up to the current media time, scoring every `latency` seconds
+                target = min(len(audio), int(self.media_time * self.audio_detector.sample_rate))
+                if target > audio_fed:
+                    self.audio_detector.ring.write(audio[audio_fed:target])
+                    audio_fed = target
+                if self.media_time - last_audio_score >= self.audio_detector.latency:
+                    last_audio_score = self.media_time
+                    terminated = self.score_audio() or terminated
+
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+            if not self.stop_on_termination:
+                terminated = False
+        cap.release()
+
+        if audio is not None and not terminated:
+            self.audio_detector.ring.write(audio[audio_fed:])
+            self.score_audio()
+
+        elapsed = time.monotonic() - start
+        return {
+            "frames": frames,
+            "media_seconds": frames / fps,
+            "wall_seconds": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "realtime_factor": (frames / fps) / elapsed if elapsed > 0 else 0.0,
+            "peak_rss_mb": self.peak_rss / (1024 * 1024),
+            "stages": self.timer.summary(),
+            "motion_gate": self.worker.gate_stats(),
+            "audio_vad": self.audio_detector.vad.stats() if self.audio_detector and self.audio_detector.vad else None,
+            "warning_count": self.policy.warning_count,
+            "terminated": self.policy.warning_count >= self.policy.max_warnings,
+            "timeline": self.timeline,
+            "intervals": self.event_engine.intervals + self.event_engine.active(),
+        }
+
+    def score_audio(self):
+        audio_start = time.perf_counter()
+        is_suspicious, confidence, message = self.audio_detector.score_pending()
+        self.timer.add("audio", time.perf_counter() - audio_start)
+        if is_suspicious:
+            return self.record(message, "audio", float(confidence))
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the detection pipeline")
+    parser.add_argument("video", help="Recorded webcam video")
+    parser.add_argument("--audio", help="Recorded microphone WAV file")
+    parser.add_argument("--realtime", action="store_true", help="Pace playback at the video's frame rate")
+    parser.add_argument("--no-stop", action="store_true", help="Keep going after the warning limit is reached")
+    parser.add_argument("--report", help="Write the full report (stages, timeline) as JSON")
+    parser.add_argument("--unified", help="Unified YOLOv5 weights to use for both objects and faces")
+    parser.add_argument("--profile", help="Configuration profile (e.g. low-end-laptop, lab-workstation)")
+    args = parser.parse_args()
+
+    config = load_config(profile=args.profile)
+    detectors = {}
+    if args.unified:
+        unified = UnifiedDetector(backend=config.objects.backend, weights_path=args.unified, config=config.objects)
+        detectors = {"object_detector": unified.objects, "face_detector": unified.faces}
+    harness = ReplayHarness(args.video, args.audio, realtime=args.realtime, stop_on_termination=not args.no_stop,
+                            config=config, **detectors)
+    report = harness.run()
+
+    print(f"{report['frames']} frames ({report['media_seconds']:.1f}s of video) in {report['wall_seconds']:.1f}s: "
+          f"{report['fps']:.1f} frames/s, {report['realtime_factor']:.1f}x real time, "
+          f"peak RSS {report['peak_rss_mb']:.0f} MB")
+    print(f"{'stage':<8} {'count':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<8} {stats['count']:6d} {stats['p50_ms']:8.1f} {stats['p90_ms']:8.1f} "
+              f"{stats['p99_ms']:8.1f} {stats['max_ms']:8.1f}")
+    if report["audio_vad"]:
+        vad = report["audio_vad"]
+        print(f"audio VAD skipped {vad['skipped']}/{vad['checked']} windows ({100 * vad['skip_ratio']:.0f}%)")
+    for event in report["timeline"]:
+        status = f"{event['warning_count']}/{harness.policy.max_warnings}" if event["counted"] else "not counted"
+        print(f"{event['time']:8.2f}s [{event['detector']}] {event['message']} ({status})")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,54 @@
+import math
+
+import cv2
+
+
+# Sizing helpers for running each detector on the part of the frame it needs:
+# faces on a downscaled copy, objects on the candidate's hands/desk region
+# found from the face box.
+
+
+def downscale(image, max_width):
+    # (resized image, factor) with factor = original / resized; images already
+    # narrower than max_width are returned as they are
+    h, w = image.shape[:2]
+    if not max_width or w <= max_width:
+        return image, 1.0
+    factor = w / max_width
+    size = (max_width, max(1, int(round(h / factor))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), factor
+
+
+def largest_face(faces):
+    if not faces:
+        return None
+    return max(faces, key=lambda face: face['box'][2] * face['box'][3])['box']
+
+
+def desk_region(face_box, frame_shape, width_factor=3.0, above_factor=0.5, min_side=96):
+    # Region where phones, books and hands show up: from just above the face
+    # down to the bottom of the frame, `width_factor` face widths to each side.
+    # Returns (x1, y1, x2, y2) in frame pixels, or None for the whole frame.
+    if face_box is None:
+        return None
+    frame_h, frame_w = frame_shape[:2]
+    x, y, w, h = face_box
+    if w <= 0 or h <= 0:
+        return None
+    cx = x + w / 2
+    x1 = int(max(0, cx - width_factor * w))
+    x2 = int(min(frame_w, cx + width_factor * w))
+    y1 = int(max(0, y - above_factor * h))
+    y2 = frame_h
+    if x2 - x1 < min_side or y2 - y1 < min_side:
+        return None
+    if (x2 - x1) * (y2 - y1) >= 0.9 * frame_w * frame_h:
+        return None  # Barely smaller than the frame: not worth a crop
+    return x1, y1, x2, y2
+
+
+def inference_size(region_shape, max_size=640, stride=32):
+    # Network input side for a crop: its longest side rounded up to the model
+    # stride, capped at the model's native size, so cost follows the ROI
+    side = max(region_shape[:2])
+    return int(min(max_size, max(stride, math.ceil(side / stride) * stride)))
@@ -0,0 +1,130 @@
+import time
+
+import psutil
+
+
+class DetectorSchedule:
+    # Per-detector state: current interval (seconds), bounds, timing and held result
+    def __init__(self, name, interval, min_interval, max_interval, hold_factor):
+        self.name = name
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hold_factor = hold_factor
+        self.next_due = 0.0
+        self.avg_inference = None  # EMA of measured inference time
+        self.runs = 0
+        self.held_value = None
+        self.held_until = 0.0
+
+
+class DetectorScheduler:
+    # Runs each detector on its own interval and keeps them at least `stagger`
+    # seconds apart so two heavy models never fire on the same tick. Intervals
+    # adapt to measured inference time and system CPU load: a detector whose
+    # duty cycle (inference time / interval) exceeds `max_duty`, or any detector
+    # while CPU is above `cpu_high`, is slowed down; when CPU drops below
+    # `cpu_low` intervals creep back toward their minimum. `clock` can be swapped
+    # for a media clock when replaying recordings faster than real time.
+    def __init__(self, stagger=0.1, adapt_every=2.0, cpu_high=80.0, cpu_low=50.0, max_duty=0.5,
+                 clock=time.monotonic):
+        self.stagger = stagger
+        self.adapt_every = adapt_every
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.max_duty = max_duty
+        self.clock = clock
+        self.schedules = {}
+        self.last_adapt = clock()
+        psutil.cpu_percent(interval=None)  # Prime the non-blocking CPU sampler
+
+    def add(self, name, interval, min_interval=None, max_interval=None, hold_factor=1.5):
+        schedule = DetectorSchedule(name, interval, min_interval or interval / 2,
+                                    max_interval or interval * 4, hold_factor)
+        # Spread initial start times evenly across one interval
+        offset = len(self.schedules) * interval / (len(self.schedules) + 1)
+        schedule.next_due = self.clock() + offset
+        self.schedules[name] = schedule
+        self.restagger()
+        return schedule
+
+    def set_interval(self, name, interval, now=None):
+        # New base interval (e.g. from a configuration reload); the adaptive
+        # bounds follow it and a pending run is never pushed further out
+        now = self.clock() if now is None else now
+        schedule = self.schedules[name]
+        schedule.interval = interval
+        schedule.min_interval = interval / 2
+        schedule.max_interval = interval * 4
+        schedule.next_due = min(schedule.next_due, now + interval)
+        self.restagger()
+
+    def restagger(self):
+        # Push start times apart so no two detectors are due within `stagger` seconds
+        ordered = sorted(self.schedules.values(), key=lambda s: s.next_due)
+        for previous, schedule in zip(ordered, ordered[1:]):
+            if schedule.next_due - previous.next_due < self.stagger:
+                schedule.next_due = previous.next_due + self.stagger
+
+    def next_due(self):
+        return min(schedule.next_due for schedule in self.schedules.values())
+
+    def due(self, now=None):
+        # At most one detector per call, so a single frame never pays for two models
+        now = self.clock() if now is None else now
+        ready = [s for s in self.schedules.values() if s.next_due <= now]
+        if not ready:
+            return None
+        return min(ready, key=lambda s: s.next_due).name
+
+    def record(self, name, elapsed, now=None):
+        # Called after a detector ran; schedules its next run and adapts intervals
+        now = self.clock() if now is None else now
+        schedule = self.schedules[name]
+        schedule.runs += 1
+        if schedule.avg_inference is None:
+            schedule.avg_inference = elapsed
+        else:
+            schedule.avg_inference = 0.8 * schedule.avg_inference + 0.2 * elapsed
+        schedule.next_due = now + schedule.interval
+        self.restagger()
+
+        if now - self.last_adapt >= self.adapt_every:
+            self.last_adapt = now
+            self.adapt(psutil.cpu_percent(interval=None))
+
+    def skip(self, name, now=None):
+        # The detector was due but its previous result was reused (e.g. static scene):
+        # reschedule without feeding the near-zero cost into the inference time average
+        now = self.clock() if now is None else now
+        schedule = self.schedules[name]
+        schedule.next_due = now + schedule.interval
+        self.restagger()
+
+    def adapt(self, cpu_percent):
+        for schedule in self.schedules.values():
+            if schedule.avg_inference is None:
+                continue
+            duty = schedule.avg_inference / schedule.interval
+            if cpu_percent > self.cpu_high or duty > self.max_duty:
+                schedule.interval = min(schedule.max_interval, schedule.interval * 1.25)
+            elif cpu_percent < self.cpu_low and duty < self.max_duty / 2:
+                schedule.interval = max(schedule.min_interval, schedule.interval * 0.9)
+
+    def hold(self, name, value, now=None):
+        # Keep a detector's latest result alive until its next run is overdue, so
+        # frames on which it is skipped still carry its active alert
+        now = self.clock() if now is None else now
+        schedule = self.schedules[name]
+        schedule.held_value = value
+        schedule.held_until = now + schedule.interval * schedule.hold_factor
+
+    def held(self, name, now=None):
+        now = self.clock() if now is None else now
+        schedule = self.schedules[name]
+        if now > schedule.held_until:
+            return None
+        return schedule.held_value
+
+    def intervals(self):
+        return {name: schedule.interval for name, schedule in self.schedules.items()}
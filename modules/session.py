@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import psutil
+
+from modules.audio_detection import AudioDetector
+from modules.config import load_config, ConfigWatcher, ConfigError, RESTART_FIELDS
+from modules.evidence import EvidenceRecorder
+from modules.face_detection import FaceDetector
+from modules.metrics import get_metrics, MetricsServer, METRICS_PORT
+from modules.model_cache import ModelLoader
+from modules.object_detection import ObjectDetector
+from modules.pipeline import LatestQueue, CaptureThread, DetectionWorker
+from modules.process_workers import plan_workers
+from modules.temporal import TemporalAggregator, detection_observations, event_warning
+from modules.unified_detection import UnifiedDetector, UNIFIED_WEIGHTS
+from modules.utils import ViolationLogger, debug, to_json
+from modules.violations import ViolationPolicy, ViolationEngine, uncounted_warnings
+
+
+class SessionError(RuntimeError):
+    pass
+
+
+class MonitoringSession:
+    # GUI-free core of a monitored test: webcam capture, background model
+    # loading, the detection worker and its scheduler, temporal aggregation,
+    # the audio stream, the violation engine, the evidence recorder, the
+    # violation log, metrics and configuration reloads. It owns every thread
+    # and closes them in close().
+    #
+    # Everything a front end needs arrives as event dicts:
+    #   {"type": "model_ready", "name", "seconds"}
+    #   {"type": "model_error", "name", "error"}  the test runs without it
+    #   {"type": "detection", "result"}     pipeline result (boxes, faces)
+    #   {"type": "violations", "batch"}     coalesced ViolationEngine batch
+    #   {"type": "config", "config", "changed"}
+    #   {"type": "closed"}
+    # either through subscribe(callback), called on the producing thread (the
+    # PyQt window forwards them as signals), or through the `events()` async
+    # iterator. `run()` drives a headless session from asyncio. With
+    # `display`, `display_queue` carries the latest frame for a preview.
+    # `source` is a camera index: capture is unpaced and never ends, so recorded
+    # sessions go through modules.replay instead.
+    def __init__(self, config=None, source=0, session_id=None, display=False, isolate=None):
+        self.config = config or load_config()
+        self.source = source
+        self.session_id = session_id or time.strftime("%Y%m%d-%H%M%S")
+        self.isolate = os.environ.get("CHEATSHIELD_ISOLATE", "0") == "1" if isolate is None else isolate
+        self.metrics = get_metrics()
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.started = False
+        self.closed = False
+        self.terminated = False
+        self.paused = False
+        self.events_dropped = 0
+        self.start_time = None
+        self.first_detection = None
+
+        # Detectors load in the background and come online one by one; until
+        # then their slot is None
+        self.object_detector = None
+        self.face_detector = None
+        self.audio_detector = None
+
+        violations = self.config.violations
+        self.policy = ViolationPolicy(violations.max_warnings, violations.cooldown,
+                                      uncounted=uncounted_warnings(violations))
+        # Detections must persist across runs before they become a violation
+        self.event_engine = TemporalAggregator(mode='ema', alpha=violations.alpha,
+                                               on_threshold=violations.on_threshold,
+                                               off_threshold=violations.off_threshold,
+                                               repeat=violations.cooldown)
+        self.display_queue = LatestQueue(maxsize=1) if display else None
+        self.detect_queue = LatestQueue(maxsize=1)
+        self.cap = None
+        self.capture_thread = None
+        self.detection_worker = None
+        self.violation_engine = None
+        self.violation_log = None
+        self.evidence = None
+        self.model_loader = None
+        self.metrics_server = None
+        self.config_watcher = None
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, event):
+        for callback in list(self.subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error delivering {event['type']} event: {e}")
+
+    def start(self):
+        # Opens the webcam and starts every thread; models load
+        # in the background. Returns self.
+        if self.started:
+            return self
+        self.start_time = time.monotonic()
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            self.cap = None
+            raise SessionError(f"Could not open camera {self.source}")
+        # Structured, asynchronously written violation log (logs/violations.jsonl)
+        try:
+            self.violation_log = ViolationLogger(session_id=self.session_id)
+        except OSError as e:
+            self.cap.release()
+            self.cap = None
+            raise SessionError(f"Could not open the violation log: {e}")
+        self.started = True
+        # Native resolution for small objects; faces are detected on a smaller
+        # copy and objects on the desk region below the face
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.capture.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.capture.height)
+        # Recent frames (and audio, once loaded) kept in memory; each counted
+        # violation is saved as a clip under logs/evidence
+        self.evidence = EvidenceRecorder(session_id=self.session_id)
+        self.metrics.register_callback("evidence_buffer_bytes", "gauge", self.evidence.memory_bytes)
+        # Detectors, the audio thread and any front end submit violations to one
+        # engine thread that owns the policy
+        self.violation_engine = ViolationEngine(self.policy, self.violation_batch,
+                                                on_decision=self.record_violation).start()
+
+        # Capture -> detect pipeline on background threads
+        self.capture_thread = CaptureThread(self.cap, self.display_queue, self.detect_queue,
+                                            on_frame=self.evidence.add_frame)
+        # Object detection starts at 0.8 s (the old every-8th-tick rate); face tracking is
+        # cheap enough to update at 0.2 s. The worker's scheduler staggers and adapts both.
+        object_interval, face_interval = self.detection_intervals()
+        self.detection_worker = DetectionWorker(self.detect_queue, None, None, self.handle_detection,
+                                                object_interval=object_interval, face_interval=face_interval,
+                                                motion_gating=self.config.motion.gating,
+                                                gate_options={"threshold": self.config.motion.threshold},
+                                                object_roi=self.config.objects.roi)
+        self.capture_thread.start()
+        self.detection_worker.start()
+        queues = [("detect", self.detect_queue)]
+        if self.display_queue is not None:
+            queues.insert(0, ("display", self.display_queue))
+        for name, queue in queues:
+            self.metrics.register_callback("queue_depth", "gauge", queue.__len__, queue=name)
+            self.metrics.register_callback("frames_dropped_total", "counter", lambda q=queue: q.dropped, queue=name)
+        # Prometheus-text endpoint on localhost (CHEATSHIELD_METRICS_PORT)
+        self.metrics_server = MetricsServer(self.metrics, METRICS_PORT).start() if METRICS_PORT else None
+
+        self.load_models()
+        # Edits to the configuration file are applied while the test runs
+        self.config_watcher = ConfigWatcher(self.config, self.config_changed).start()
+        return self
+
+    def detection_intervals(self):
+        # A unified pass costs a full YOLOv5 run, not a tracker update
+        face_interval = max(self.config.faces.interval, 0.4) if UNIFIED_WEIGHTS else self.config.faces.interval
+        return self.config.objects.interval, face_interval
+
+    def load_models(self):
+        # YOLOv5, MTCNN and YAMNet load in parallel on the loader's threads
+        self.model_loader = ModelLoader(self.model_loaded, self.model_failed)
+
+        # CHEATSHIELD_ISOLATE=1 runs each model in its own process with its own thread
+        # budget, pinned to its own block of cores, so PyTorch and TensorFlow stop
+        # competing for the same CPUs
+        isolation = {"objects": {}, "faces": {}, "audio": {}}
+        if self.isolate:
+            # A unified model needs no separate face process
+            kinds = [kind for kind in isolation if not (UNIFIED_WEIGHTS and kind == "faces")]
+            for kind, plan in plan_workers(kinds).items():
+                isolation[kind] = {"isolated": True, **plan}
+
+        objects, faces, audio = self.config.objects, self.config.faces, self.config.audio
+        if UNIFIED_WEIGHTS:
+            # CHEATSHIELD_UNIFIED_WEIGHTS: one YOLOv5 model with a face class serves both detectors
+            self.model_loader.submit("unified", lambda: UnifiedDetector(backend=objects.backend, config=objects,
+                                                                        **isolation["objects"]))
+        else:
+            self.model_loader.submit("objects", lambda: ObjectDetector(backend=objects.backend, config=objects,
+                                                                       **isolation["objects"]))
+            # MTCNN runs every 8th face update (or when tracking is lost); a KCF tracker follows faces in between
+            self.model_loader.submit("faces", lambda: FaceDetector(backend=faces.backend, tracking=True,
+                                                                   redetect_every=faces.redetect_every,
+                                                                   input_width=faces.input_width or None,
+                                                                   **isolation["faces"]))
+        self.model_loader.submit("audio", lambda: AudioDetector(sample_rate=16000, chunk_size=1024,
+                                                                detection_interval=audio.detection_interval,
+                                                                window_seconds=0.975, hop_seconds=0.48,
+                                                                latency=audio.latency,
+                                                                buffer_seconds=30.0,  # Also evidence audio
+                                                                monitored_classes=audio.thresholds,
+                                                                pooling=audio.pooling, vad=audio.vad,
+                                                                **isolation["audio"]))
+
+    def model_loaded(self, name, detector, seconds):
+        # Runs on a model loader thread; serialized with close()
+        with self.lock:
+            if self.closed:
+                detector.close()
+                return
+
+            # Settings reloaded while the model was loading apply from the start
+            if name == "objects":
+                detector.configure(self.config.objects)
+                self.object_detector = self.detection_worker.object_detector = detector
+            elif name == "faces":
+                detector.configure(self.config.faces)
+                self.face_detector = self.detection_worker.face_detector = detector
+            elif name == "unified":
+                detector.objects.configure(self.config.objects)
+                self.object_detector = self.detection_worker.object_detector = detector.objects
+                self.face_detector = self.detection_worker.face_detector = detector.faces
+            else:
+                # Start continuous audio detection (scored on the detector's own thread)
+                detector.configure(self.config.audio)
+                self.audio_detector = detector
+                self.evidence.set_audio(detector.ring, detector.sample_rate)
+                self.audio_detector.start_stream(self.audio_monitoring)
+        print(f"{name} detector online after {seconds:.1f}s "
+              f"({time.monotonic() - self.start_time:.1f}s since start)")
+        self.publish({"type": "model_ready", "name": name, "seconds": seconds})
+
+    def model_failed(self, name, error):
+        # Runs on a model loader thread
+        print(f"Warning: the {name} detector is unavailable; this session runs without it")
+        self.publish({"type": "model_error", "name": name, "error": str(error)})
+
+    def handle_detection(self, result):
+        # Runs on the detection worker thread
+        if self.closed:
+            return
+        if self.first_detection is None:
+            self.first_detection = time.monotonic() - self.start_time
+        self.evidence.add_detections(result)
+
+        classes = self.object_detector.classes if self.object_detector is not None else []
+        for source in result["sources"]:
+            source, observations = detection_observations(result, classes, source)
+            if source is None:
+                continue
+            now = time.time()
+            for event in self.event_engine.update(source, now, observations):
+                message, detector = event_warning(event)
+                if event["type"] in ("start", "repeat"):
+                    # Stamped with the aggregator's time so a repeat lands
+                    # exactly one cooldown after the previous report
+                    self.report_violation(message, detector, event["confidence"], event["box"],
+                                          kind=f"{source}:{event['label']}", now=now)
+                else:
+                    # Closed interval: recorded for review, never counted again
+                    self.violation_log.log(detector, f"Ended: {message}", event["confidence"], event["box"],
+                                           interval_start=event["start"], interval_end=event["end"],
+                                           duration=event["end"] - event["start"])
+        self.publish({"type": "detection", "result": result})
+
+    def audio_monitoring(self, confidence, message):
+        # Runs on the audio scoring thread
+        self.report_violation(message, "audio", confidence)
+
+    def report_violation(self, message, detector="system", confidence=None, boxes=None, kind=None, now=None):
+        # Safe from any thread: only enqueues for the violation engine
+        if self.started and not self.closed and not self.terminated and not self.paused:
+            self.violation_engine.submit(message, detector, confidence, boxes, kind=kind, now=now)
+
+    def pause(self):
+        # Stop submitting violations (e.g. while the proctor's end-test dialog
+        # is open); detection, logging and evidence keep running
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def record_violation(self, event, decision):
+        # Runs on the violation engine thread for every accepted violation
+        message, detector = event["message"], event["detector"]
+        counted = decision["counted"]
+        evidence = self.evidence.trigger(message, detector, event["confidence"], event["boxes"]) if counted else None
+        self.violation_log.log(detector, message, event["confidence"], event["boxes"], counted=counted,
+                               warning_count=decision["warning_count"], evidence=evidence)
+        if counted:
+            debug(f"Warning {decision['warning_count']}/{self.policy.max_warnings}: {message}")
+        else:
+            debug(f"Warning (not counted): {message}")
+
+    def violation_batch(self, batch):
+        # Runs on the violation engine thread
+        if batch["terminate"]:
+            self.terminated = True
+        self.publish({"type": "violations", "batch": batch})
+
+    def config_changed(self, config, changed):
+        # Runs on the config watcher thread. Thresholds, rates and limits go to
+        # the running components; no model is reloaded.
+        self.config = config
+        restart = [name for name in changed if name in RESTART_FIELDS]
+        if restart:
+            print(f"Configuration changes that apply at the next start: {', '.join(restart)}")
+        for detector, section in ((self.object_detector, config.objects), (self.face_detector, config.faces),
+                                  (self.audio_detector, config.audio)):
+            if detector is not None:
+                detector.configure(section)
+        object_interval, face_interval = self.detection_intervals()
+        self.detection_worker.configure(object_interval, face_interval, config.objects.roi, config.motion.threshold)
+
+        violations = config.violations
+        self.violation_engine.configure(max_warnings=violations.max_warnings, cooldown=violations.cooldown,
+                                        uncounted=uncounted_warnings(violations))
+        self.event_engine.alpha = violations.alpha
+        self.event_engine.on_threshold = violations.on_threshold
+        self.event_engine.off_threshold = violations.off_threshold
+        self.event_engine.repeat = violations.cooldown
+        print(f"Configuration reloaded: {', '.join(changed)}")
+        self.publish({"type": "config", "config": config, "changed": changed})
+
+    async def events(self, maxsize=256):
+        # Async iterator over session events, delivered onto the running loop.
+        # A consumer that falls `maxsize` events behind loses the oldest ones.
+        # Ends after the "closed" event.
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize)
+
+        def put(event):
+            if queue.full():
+                queue.get_nowait()
+                self.events_dropped += 1
+            queue.put_nowait(event)
+
+        def deliver(event):
+            try:
+                loop.call_soon_threadsafe(put, event)
+            except RuntimeError:
+                pass  # Loop already closed
+
+        self.subscribe(deliver)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] == "closed":
+                    break
+        finally:
+            self.unsubscribe(deliver)
+
+    async def run(self, duration=None, on_event=None):
+        # Headless driver: starts the session and closes it when the warning
+        # limit is reached, after `duration` seconds or when cancelled. Returns
+        # stats().
+        loop = asyncio.get_running_loop()
+
+        async def until_terminated():
+            async for event in self.events():
+                if on_event is not None:
+                    on_event(event)
+                if event["type"] == "violations" and event["batch"]["terminate"]:
+                    return
+
+        await loop.run_in_executor(None, self.start)
+        try:
+            await asyncio.wait_for(until_terminated(), duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # close() joins threads, so it runs off the event loop
+            await loop.run_in_executor(None, self.close)
+        return self.stats()
+
+    def stats(self):
+        policy = self.policy
+        return {
+            "session_id": self.session_id,
+            "warning_count": policy.warning_count,
+            "max_warnings": policy.max_warnings,
+            "terminated": self.terminated,
+            "first_detection_seconds": self.first_detection,
+            "events_dropped": self.events_dropped,
+            "rss_mb": psutil.Process().memory_info().rss / (1024 * 1024),
+        }
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        if not self.started:
+            self.publish({"type": "closed"})
+            return
+        self.config_watcher.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        self.model_loader.shutdown()
+        if self.audio_detector is not None:
+            self.audio_detector.close()
+            if self.audio_detector.vad is not None:
+                debug(f"Audio VAD stats: {self.audio_detector.vad.stats()}")
+        self.capture_thread.stop()
+        self.detection_worker.stop()
+        if self.display_queue is not None:
+            self.display_queue.close()
+        self.detect_queue.close()
+        self.capture_thread.join(timeout=1.0)
+        self.detection_worker.join(timeout=5.0)
+        debug(f"Motion gate stats: {self.detection_worker.gate_stats()}")
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if self.object_detector is not None:
+            self.object_detector.close()
+            self.object_detector = None
+            self.detection_worker.object_detector = None
+            # Only release CUDA memory when the PyTorch backend actually loaded torch
+            torch = sys.modules.get('torch')
+            if torch is not None:
+                torch.cuda.empty_cache()
+        if self.face_detector is not None:
+            self.face_detector.close()
+            self.face_detector = None
+            self.detection_worker.face_detector = None
+        self.violation_engine.stop()
+        self.evidence.close()
+        self.violation_log.close()
+        self.publish({"type": "closed"})
+
+
+if __name__ == "__main__":
+    # Headless monitoring without Qt or a browser engine:
+    #   python -m modules.session [--source 0] [--duration 3600] [--profile low-end-laptop]
+    # Violations are printed as JSON lines; the log and evidence clips are
+    # written as in the desktop client.
+    parser = argparse.ArgumentParser(description="Monitor a candidate without the desktop client")
+    parser.add_argument("--source", type=int, default=0,
+                        help="Camera index (replay recordings with python -m modules.replay)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--profile", help="Configuration profile (e.g. low-end-laptop, lab-workstation)")
+    args = parser.parse_args()
+
+    def print_violations(event):
+        if event["type"] == "violations":
+            for decision in event["batch"]["decisions"]:
+                print(json.dumps(decision, default=to_json), flush=True)
+
+    try:
+        session = MonitoringSession(load_config(profile=args.profile), source=args.source)
+        stats = asyncio.run(session.run(args.duration, on_event=print_violations))
+    except (ConfigError, SessionError) as e:
+        sys.exit(f"Error: {e}")
+    except KeyboardInterrupt:
+        session.close()
+        stats = session.stats()
+    print(f"Session {stats['session_id']} ended: {stats['warning_count']}/{stats['max_warnings']} warnings, "
+          f"first detection after {stats['first_detection_seconds'] or 0:.1f}s, RSS {stats['rss_mb']:.0f} MB")
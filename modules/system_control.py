@@ -1,52 +1,262 @@
-import keyboard
-import pyautogui
+import collections
+import queue
+import threading
 import time
 
-class SystemController:
+
+def key_name(name):
+    # 'left alt' / 'right alt' -> 'alt', so combinations do not depend on the side
+    name = (name or "").lower()
+    for side in ("left ", "right "):
+        if name.startswith(side):
+            return name[len(side):]
+    return name
+
+
+class KeyEvent:
+    def __init__(self, name, event_type, timestamp=None):
+        self.name = name
+        self.event_type = event_type  # 'down' or 'up'
+        self.time = time.time() if timestamp is None else timestamp
+
+
+class KeyboardBackend:
+    # Real input: global hooks from the `keyboard` package (root on Linux) and
+    # key presses through pyautogui. Imported lazily so the fake backend works
+    # on machines without either.
+    def __init__(self):
+        import keyboard
+        import pyautogui
+
+        self.keyboard = keyboard
+        self.pyautogui = pyautogui
+        self.hook_handle = None
+
+    def hook(self, callback):
+        self.hook_handle = self.keyboard.hook(callback)
+
+    def unhook(self):
+        if self.hook_handle is not None:
+            self.keyboard.unhook(self.hook_handle)
+            self.hook_handle = None
+
+    def block(self, hotkey):
+        # Returning False from the handler suppresses the key combination
+        self.keyboard.add_hotkey(hotkey, lambda: False, suppress=True)
+
+    def unblock(self, hotkey):
+        self.keyboard.remove_hotkey(hotkey)
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+
+class FakeInputBackend:
+    # Replays recorded key-event sequences into the controller and records what
+    # it would have pressed or blocked. Needs no OS hooks, so it runs anywhere.
     def __init__(self):
+        self.callback = None
+        self.blocked = set()
+        self.pressed = []
+
+    def hook(self, callback):
+        self.callback = callback
+
+    def unhook(self):
+        self.callback = None
+
+    def block(self, hotkey):
+        self.blocked.add(hotkey)
+
+    def unblock(self, hotkey):
+        self.blocked.discard(hotkey)
+
+    def press(self, key):
+        self.pressed.append(key)
+
+    def replay(self, events, realtime=True):
+        # events: iterable of (delay_seconds, key, 'down' | 'up')
+        for delay, key, event_type in events:
+            if realtime and delay > 0:
+                time.sleep(delay)
+            if self.callback is not None:
+                self.callback(KeyEvent(key, event_type))
+
+
+class EnforcementAction:
+    # One enforcement response with its own debounce. Latency runs from the
+    # moment the triggering event was observed to the handler returning.
+    def __init__(self, name, handler, debounce=1.0):
+        self.name = name
+        self.handler = handler
+        self.debounce = debounce
+        self.last_run = None
+        self.runs = 0
+        self.suppressed = 0
+        self.latencies = collections.deque(maxlen=1000)
+
+    def trigger(self, observed_at, *args):
+        now = time.perf_counter()
+        if self.last_run is not None and now - self.last_run < self.debounce:
+            self.suppressed += 1
+            return False
+        self.last_run = now
+        try:
+            self.handler(*args)
+        except Exception as e:
+            print(f"Error in {self.name} action: {e}")
+        self.latencies.append(time.perf_counter() - observed_at)
+        self.runs += 1
+        return True
+
+    def stats(self):
+        ms = sorted(latency * 1000 for latency in self.latencies)
+        return {
+            "runs": self.runs,
+            "suppressed": self.suppressed,
+            "p50_ms": ms[len(ms) // 2] if ms else None,
+            "max_ms": ms[-1] if ms else None,
+        }
+
+
+class SystemController:
+    # Event-driven exam enforcement. Key hooks and window focus/fullscreen
+    # notifications only enqueue events; one dispatcher thread turns them into
+    # debounced enforcement actions (re-fullscreen, warning), so nothing polls.
+    # Window toolkits report state changes through notify_focus/notify_fullscreen.
+    def __init__(self, backend=None, on_warning=None, on_refullscreen=None, refullscreen_debounce=1.0,
+                 warning_debounce=2.0):
         self.is_test_active = False
         self.hotkeys = ['ctrl+c', 'ctrl+v', 'cmd+c', 'cmd+v']  # Key combinations to block
+        self.backend = backend
+        self.on_warning = on_warning
+        self.events = queue.Queue()
+        self.keys_down = set()
+        self.dispatcher = None
+        self.actions = {
+            "refullscreen": EnforcementAction("refullscreen", on_refullscreen or self.press_f11,
+                                              refullscreen_debounce),
+            "warning": EnforcementAction("warning", self.warn, warning_debounce),
+        }
 
-    def suppress_hotkey(self):
-        # This function will be called when a blocked hotkey is pressed, and it will suppress the action
-        return False
+    def press_f11(self):
+        # Enforce fullscreen mode (using pyautogui to simulate F11)
+        self.backend.press('f11')
+
+    def warn(self, message):
+        print(f"Warning: {message}")
+        if self.on_warning is not None:
+            self.on_warning(message)
 
     def start_test(self):
+        if self.backend is None:
+            self.backend = KeyboardBackend()
         self.is_test_active = True
         print("Test started. Copy-paste is disabled, and fullscreen mode is enforced.")
 
-        # Block copy-paste shortcuts using add_hotkey
+        # Block copy-paste shortcuts
         for hotkey in self.hotkeys:
-            keyboard.add_hotkey(hotkey, self.suppress_hotkey, suppress=True)
+            self.backend.block(hotkey)
+        self.backend.hook(self.on_key)
 
-        # Enforce fullscreen mode (using pyautogui to simulate F11)
-        pyautogui.press('f11')
+        self.dispatcher = threading.Thread(target=self.dispatch, name="system-controller", daemon=True)
+        self.dispatcher.start()
+        self.press_f11()
 
     def stop_test(self):
+        if not self.is_test_active:
+            return
         self.is_test_active = False
         print("Test stopped. Copy-paste is re-enabled.")
 
         # Remove hotkey blocks
+        self.backend.unhook()
         for hotkey in self.hotkeys:
-            keyboard.remove_hotkey(hotkey)
+            self.backend.unblock(hotkey)
+        self.events.put(None)
+        self.dispatcher.join(timeout=1.0)
 
         # Exit fullscreen mode (optional, simulate F11 again to toggle)
-        pyautogui.press('f11')
+        self.press_f11()
 
-    def monitor_system(self):
+    # Event sources: called from hook/GUI threads, they only enqueue
+    def on_key(self, event):
+        self.events.put(("key", time.perf_counter(), key_name(event.name), event.event_type))
+
+    def notify_focus(self, focused):
+        self.events.put(("focus", time.perf_counter(), focused))
+
+    def notify_fullscreen(self, fullscreen):
+        self.events.put(("fullscreen", time.perf_counter(), fullscreen))
+
+    def dispatch(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            kind, observed_at = event[0], event[1]
+            if kind == "key":
+                self.handle_key(observed_at, event[2], event[3])
+            elif kind == "focus" and not event[2]:
+                self.enforce(observed_at, "Window focus lost")
+            elif kind == "fullscreen" and not event[2]:
+                self.enforce(observed_at, "Fullscreen mode exited")
+
+    def handle_key(self, observed_at, name, event_type):
+        if event_type == "up":
+            self.keys_down.discard(name)
+            return
+        if name in self.keys_down:
+            return  # Auto-repeat of a held key
+        self.keys_down.add(name)
         # Monitor for attempts to exit fullscreen (e.g., Alt+Tab, Esc)
-        while self.is_test_active:
-            if keyboard.is_pressed('alt+tab') or keyboard.is_pressed('esc'):
-                print("Warning: Attempt to exit fullscreen detected!")
-                pyautogui.press('f11')  # Re-enforce fullscreen
-            time.sleep(0.1)
+        if name == "esc" or (name == "tab" and "alt" in self.keys_down):
+            self.enforce(observed_at, "Attempt to exit fullscreen detected!")
+
+    def enforce(self, observed_at, message):
+        if not self.is_test_active:
+            return
+        self.actions["refullscreen"].trigger(observed_at)
+        self.actions["warning"].trigger(observed_at, message)
+
+    def monitor_system(self):
+        # Block until the test is stopped; enforcement happens on the dispatcher
+        while self.is_test_active and self.dispatcher.is_alive():
+            self.dispatcher.join(timeout=0.5)
+
+    def stats(self):
+        return {name: action.stats() for name, action in self.actions.items()}
+
 
 # Example usage (for testing)
 if __name__ == "__main__":
-    controller = SystemController()
-    controller.start_test()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the system controller")
+    parser.add_argument("--fake", action="store_true",
+                        help="Replay a scripted key sequence through the fake input backend")
+    args = parser.parse_args()
+
+    if args.fake:
+        backend = FakeInputBackend()
+        controller = SystemController(backend=backend)
+        controller.start_test()
+        backend.replay([
+            (0.1, "left alt", "down"), (0.05, "tab", "down"), (0.05, "tab", "up"), (0.0, "left alt", "up"),
+            (0.2, "esc", "down"), (0.05, "esc", "down"), (0.05, "esc", "up"),  # auto-repeat is ignored
+            (0.3, "esc", "down"), (0.05, "esc", "up"),  # debounced
+            (2.5, "esc", "down"), (0.05, "esc", "up"),
+        ])
+        controller.notify_focus(False)
+        time.sleep(0.1)
+        controller.stop_test()
+        print(f"Pressed: {backend.pressed}")
+        print(f"Actions: {controller.stats()}")
+    else:
+        controller = SystemController()
+        controller.start_test()
 
-    try:
-        controller.monitor_system()
-    except KeyboardInterrupt:
-        controller.stop_test()
\ No newline at end of file
+        try:
+            controller.monitor_system()
+        except KeyboardInterrupt:
+            controller.stop_test()
@@ -0,0 +1,185 @@
+import collections
+import itertools
+
+import numpy as np
+
+
+class Track:
+    # Evidence for one class (and, for boxed detections, one spatial track)
+    def __init__(self, source, label, track_id, now, n):
+        self.source = source
+        self.label = label
+        self.track_id = track_id
+        self.score = 0.0  # EMA of presence (1 on a hit, 0 on a miss)
+        self.confidence = None  # EMA of detection confidence over hits
+        self.votes = collections.deque(maxlen=n)
+        self.active = False
+        self.start = None
+        self.reported = None  # When the track was last reported (start or repeat)
+        self.last_seen = now
+        self.peak_confidence = 0.0
+        self.box = None
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class TemporalAggregator:
+    # Incremental event engine over per-frame detections. Each update carries
+    # the observations of one source (a detector run); they are matched to
+    # per-class tracks by IoU, tracks of that source that were not observed get
+    # a miss, and each track's presence is smoothed either with an EMA
+    # (mode='ema': start at >= on_threshold, end below off_threshold) or with
+    # k-of-n voting (mode='vote'); confidences are EMA-smoothed for reporting.
+    # A 'start' event is emitted only once the evidence persists, and an 'end'
+    # event closes the interval when it fades or the track has not been seen
+    # for `max_gap` seconds. With `repeat`, an active track is reported again
+    # as a 'repeat' event every `repeat` seconds: a violation that persists
+    # keeps counting (once per policy cooldown, as it did before smoothing),
+    # and a start swallowed by its type's cooldown is counted once it expires.
+    def __init__(self, mode='ema', alpha=0.4, on_threshold=0.5, off_threshold=0.2, k=3, n=5,
+                 iou_match=0.3, max_gap=3.0, repeat=None):
+        self.mode = mode
+        self.alpha = alpha
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.k = k
+        self.n = n
+        self.iou_match = iou_match
+        self.max_gap = max_gap
+        self.repeat = repeat
+        self.tracks = {}  # (source, label, track_id) -> Track
+        self.track_ids = itertools.count(1)
+        self.intervals = []  # Completed (closed) violation intervals
+
+    def update(self, source, now, observations):
+        # observations: list of (label, confidence, box or None). Returns events.
+        matched = set()
+        for label, confidence, box in observations:
+            track = self.match(source, label, box, matched, now)
+            matched.add(id(track))
+            self.observe(track, confidence, box, now)
+
+        events = []
+        for track in list(self.tracks.values()):
+            if track.source != source:
+                continue
+            if id(track) not in matched:
+                self.observe(track, 0.0, None, now, hit=False)
+            event = self.transition(track, now)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def match(self, source, label, box, matched, now):
+        candidates = [t for t in self.tracks.values()
+                      if t.source == source and t.label == label and id(t) not in matched]
+        if box is None:
+            # Unboxed observations (face counts, audio classes) use one track per class
+            if candidates:
+                return candidates[0]
+            track_id = 0
+        else:
+            best, best_iou = None, self.iou_match
+            for track in candidates:
+                if track.box is not None:
+                    iou = box_iou(track.box, box)
+                    if iou >= best_iou:
+                        best, best_iou = track, iou
+            if best is not None:
+                return best
+            track_id = next(self.track_ids)
+        track = Track(source, label, track_id, now, self.n)
+        self.tracks[(source, label, track_id)] = track
+        return track
+
+    def observe(self, track, confidence, box, now, hit=True):
+        track.score = (1 - self.alpha) * track.score + self.alpha * (1.0 if hit else 0.0)
+        track.votes.append(hit)
+        if hit:
+            if track.confidence is None:
+                track.confidence = confidence
+            else:
+                track.confidence = (1 - self.alpha) * track.confidence + self.alpha * confidence
+            track.last_seen = now
+            track.box = box
+            track.peak_confidence = max(track.peak_confidence, track.confidence)
+
+    def transition(self, track, now):
+        if self.mode == 'vote':
+            present = sum(track.votes) >= self.k
+            gone = sum(track.votes) < self.k
+        else:
+            present = track.score >= self.on_threshold
+            gone = track.score < self.off_threshold
+        gone = gone or now - track.last_seen > self.max_gap
+
+        if not track.active and present:
+            track.active = True
+            track.start = track.reported = now
+            return self.event("start", track, now)
+        if track.active and gone:
+            track.active = False
+            event = self.event("end", track, now)
+            self.intervals.append(event)
+            del self.tracks[(track.source, track.label, track.track_id)]
+            return event
+        if track.active and self.repeat and now - track.reported >= self.repeat:
+            track.reported = now
+            return self.event("repeat", track, now)
+        if not track.active and now - track.last_seen > self.max_gap:
+            # Never became a violation; forget it
+            del self.tracks[(track.source, track.label, track.track_id)]
+        return None
+
+    def event(self, kind, track, now):
+        return {
+            "type": kind,
+            "source": track.source,
+            "label": track.label,
+            "track": track.track_id,
+            "start": track.start,
+            "end": now if kind == "end" else None,
+            "confidence": float(track.peak_confidence),
+            "box": None if track.box is None else [float(v) for v in track.box],
+        }
+
+    def active(self):
+        return [self.event("active", t, None) for t in self.tracks.values() if t.active]
+
+
+def detection_observations(result, classes, source=None):
+    # Observations of one detector in a pipeline result (objects or faces);
+    # defaults to the detector that produced it
+    source = source or result["ran"]
+    if source == "objects":
+        detections = result["detections"]
+        if detections is None:
+            return source, []
+        return source, [(classes[int(cls)], float(conf), (float(x1), float(y1), float(x2), float(y2)))
+                        for x1, y1, x2, y2, conf, cls in np.asarray(detections).reshape(-1, 6)]
+    if source == "faces":
+        num_faces = result["num_faces"]
+        if num_faces == 0:
+            return source, [("no_face", 1.0, None)]
+        if num_faces is not None and num_faces > 1:
+            return source, [("multiple_faces", 1.0, None)]
+        return source, []
+    return None, []
+
+
+def event_warning(event):
+    # (message, detector) for a 'start' or 'repeat' event, worded like the per-frame warnings
+    label = event["label"]
+    if label == "no_face":
+        return "Face not visible, please show your face", "faces"
+    if label == "multiple_faces":
+        return "Abnormal Movement Detected: Multiple faces detected!", "faces"
+    if label == "mobile phone":
+        return "Warning: Mobile phone detected", "objects"
+    return f"Abnormal Movement Detected: {label} (Confidence: {event['confidence']:.2f})", "objects"
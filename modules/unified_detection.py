@@ -0,0 +1,302 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from modules.face_detection import FaceDetector
+from modules.frame import as_rgb
+from modules.object_detection import ObjectDetector
+
+# Optional single-model mode: a YOLOv5 head fine-tuned from best.pt with a
+# `face` class (and optionally `person`) appended after the object classes,
+# so one forward pass yields prohibited objects and faces together. Enabled
+# by pointing CHEATSHIELD_UNIFIED_WEIGHTS at the fine-tuned weights.
+UNIFIED_WEIGHTS = os.environ.get("CHEATSHIELD_UNIFIED_WEIGHTS")
+OBJECT_CLASSES = ['book', 'mobile phone', 'laptop']
+UNIFIED_CLASSES = OBJECT_CLASSES + ['face']
+
+
+def weights_classes(weights_path):
+    # Class names in head order, written next to the weights by fine_tune (and
+    # shared by an ONNX export in the same directory); None if there are none
+    path = os.path.join(os.path.dirname(weights_path), 'classes.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class UnifiedDetector:
+    # Runs the shared model once per frame and splits its output into object
+    # detections (same (N, 6) rows as ObjectDetector) and MTCNN-style faces.
+    # `objects` and `faces` are adapters with the ObjectDetector and
+    # FaceDetector interfaces, so the pipeline, the inference server and the
+    # replay harness use them unchanged; asking both about the same frame
+    # reuses the one pass (frames are matched by identity).
+    def __init__(self, backend='torch', weights_path=UNIFIED_WEIGHTS, classes=None, face_conf_thres=0.5,
+                 **options):
+        weights_path = weights_path or r"models\unified.pt"
+        # Weights trained with extra classes (e.g. --person) list them in classes.json
+        classes = classes or weights_classes(weights_path) or UNIFIED_CLASSES
+        self.model = ObjectDetector(backend, weights_path=weights_path, classes=classes,
+                                    model_name='yolov5-unified', **options)
+        classes = self.model.classes
+        self.face_class = classes.index('face')
+        self.person_class = classes.index('person') if 'person' in classes else None
+        self.face_conf_thres = face_conf_thres
+        self.last_frame = None
+        self.last_result = None
+        self.persons = np.zeros((0, 6), dtype=np.float32)  # Person boxes from the latest pass
+        self.closed = False
+        self.objects = UnifiedObjectView(self)
+        self.faces = UnifiedFaceView(self)
+
+    def detect_all(self, frame):
+        # (object detections, faces) for a Frame or BGR array. The pass needs the
+        # whole frame for faces, so there is no region-of-interest variant.
+        if frame is self.last_frame:
+            return self.last_result
+        result = self.split(self.model.predict([as_rgb(frame)])[0])
+        self.model.update_alerts(result[0])
+        self.last_frame, self.last_result = frame, result
+        return result
+
+    def detect_batch(self, frames):
+        # Frames from different streams in one forward pass
+        preds = self.model.predict([as_rgb(frame) for frame in frames])
+        return [self.split(pred) for pred in preds]
+
+    def split(self, pred):
+        pred = np.asarray(pred, dtype=np.float32).reshape(-1, 6)
+        # Rows of a class the names do not cover cannot be labelled or drawn
+        pred = pred[pred[:, 5].astype(int) < len(self.model.classes)]
+        cls = pred[:, 5].astype(int)
+        is_face = cls == self.face_class
+        is_person = cls == self.person_class if self.person_class is not None else np.zeros(len(pred), dtype=bool)
+
+        detections = self.model.filter_detections(pred[~is_face & ~is_person])
+        self.persons = pred[is_person]
+        faces = [{'box': [int(round(x1)), int(round(y1)), int(round(x2 - x1)), int(round(y2 - y1))],
+                  'confidence': float(conf)}
+                 for x1, y1, x2, y2, conf, _ in pred[is_face & (pred[:, 4] >= self.face_conf_thres)]]
+        return detections, faces
+
+    def close(self):
+        # Shared by both adapters, which are closed separately
+        if not self.closed:
+            self.closed = True
+            self.model.close()
+
+
+class UnifiedObjectView:
+    # ObjectDetector interface over the shared model
+    def __init__(self, unified):
+        self.unified = unified
+        self.classes = unified.model.classes
+        self.alerts = unified.model.alerts
+
+    def detect(self, frame, roi=None):
+        return self.unified.detect_all(frame)[0]
+
+    def process_image(self, frame):
+        detections, _ = self.unified.detect_all(frame)
+        return self.draw(frame, detections)
+
+    def process_batch(self, frames):
+        outputs = []
+        for frame, (detections, _) in zip(frames, self.unified.detect_batch(frames)):
+            self.unified.model.update_alerts(detections)
+            outputs.append((self.draw(frame, detections), self.alerts["objects"]))
+        return outputs
+
+    def draw(self, canvas, detections, scale=(1.0, 1.0), rgb=False):
+        return self.unified.model.draw(canvas, detections, scale, rgb)
+
+    def configure(self, config):
+        self.unified.model.configure(config)
+
+    def close(self):
+        self.unified.close()
+
+
+class UnifiedFaceView:
+    # FaceDetector interface over the shared model. There is no tracker: faces
+    # come with every pass at no extra cost.
+    annotate = FaceDetector.annotate
+
+    def __init__(self, unified):
+        self.unified = unified
+        self.draw_threshold = unified.face_conf_thres
+        self.tracker = None
+
+    def detect_raw(self, frame):
+        return self.unified.detect_all(frame)[1]
+
+    def locate(self, frame):
+        return self.detect_raw(frame)
+
+    def configure(self, config):
+        # Face boxes come from the shared pass, whose thresholds are set
+        # through the object adapter
+        pass
+
+    def detect_faces(self, frame):
+        faces = self.detect_raw(frame)
+        return len(faces), self.annotate(frame, faces)
+
+    def detect_faces_batch(self, frames):
+        return [(len(faces), self.annotate(frame, faces))
+                for frame, (_, faces) in zip(frames, self.unified.detect_batch(frames))]
+
+    def close(self):
+        self.unified.close()
+
+
+# Training recipe. Object labels keep their class ids (0-2) and `face` is
+# appended, so best.pt's backbone and neck transfer as they are and only the
+# detection head is re-initialized for the larger class count:
+#   1. python -m modules.unified_detection widerface wider_face_train_bbx_gt.txt \
+#          WIDER_train/images data/unified --split train
+#      (and the same for the val split) converts WIDER FACE to YOLO labels
+#   2. python -m modules.unified_detection pseudo-label data/objects/images/train data/objects/labels/train
+#      adds MTCNN face boxes to the object dataset, whose faces are unlabelled
+#      and would otherwise be learned as background
+#   3. python -m modules.unified_detection train data/unified data/objects --weights models/best.pt
+#      writes the dataset YAML and fine-tunes: first with the backbone frozen,
+#      then the whole network
+
+
+def write_dataset_yaml(path, roots, classes=UNIFIED_CLASSES):
+    # YOLOv5 dataset file over one or more roots laid out as images/{train,val}
+    # with matching labels/{train,val}
+    lines = [
+        f"train: {json.dumps([os.path.abspath(os.path.join(root, 'images', 'train')) for root in roots])}",
+        f"val: {json.dumps([os.path.abspath(os.path.join(root, 'images', 'val')) for root in roots])}",
+        f"nc: {len(classes)}",
+        f"names: {json.dumps(classes)}",
+    ]
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def yolo_label(cls, box, width, height):
+    # [x, y, w, h] pixels -> normalized "cls cx cy w h"
+    x, y, w, h = box
+    return f"{cls} {(x + w / 2) / width:.6f} {(y + h / 2) / height:.6f} {w / width:.6f} {h / height:.6f}"
+
+
+def convert_widerface(annotations, images_dir, out_root, split='train', face_class=3, min_size=20, max_faces=10):
+    # WIDER FACE ground truth (file name, face count, then one
+    # "x y w h blur expression illumination invalid occlusion pose" line per
+    # face) to YOLO labels. Exam webcams see one or two large faces, so
+    # crowded images and faces under `min_size` pixels are left out.
+    image_out = os.path.join(out_root, 'images', split)
+    label_out = os.path.join(out_root, 'labels', split)
+    os.makedirs(image_out, exist_ok=True)
+    os.makedirs(label_out, exist_ok=True)
+    written = 0
+    with open(annotations) as f:
+        lines = [line.strip() for line in f]
+    i = 0
+    while i < len(lines):
+        name, count = lines[i], int(lines[i + 1])
+        rows = [[int(v) for v in line.split()] for line in lines[i + 2:i + 2 + max(count, 1)]][:count]
+        i += 2 + max(count, 1)  # Images without faces still carry one all-zero line
+
+        boxes = [row[:4] for row in rows if row[7] == 0 and min(row[2], row[3]) >= min_size]
+        if not boxes or len(rows) > max_faces:
+            continue
+        image = cv2.imread(os.path.join(images_dir, name))
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        stem = os.path.splitext(name.replace('/', '_'))[0]
+        shutil.copy2(os.path.join(images_dir, name), os.path.join(image_out, stem + '.jpg'))
+        with open(os.path.join(label_out, stem + '.txt'), 'w') as out:
+            out.write("\n".join(yolo_label(face_class, box, width, height) for box in boxes) + "\n")
+        written += 1
+    return written
+
+
+def pseudo_label_faces(images_dir, labels_dir, face_class=3, min_confidence=0.95, detector=None):
+    # Append face boxes found by the current face detector to existing YOLO
+    # label files (rows already labelled as faces are replaced)
+    detector = detector or FaceDetector(backend='mtcnn')
+    labelled = 0
+    for path in sorted(glob.glob(os.path.join(images_dir, '*'))):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        label_path = os.path.join(labels_dir, os.path.splitext(os.path.basename(path))[0] + '.txt')
+        rows = []
+        if os.path.exists(label_path):
+            with open(label_path) as f:
+                rows = [line.strip() for line in f if line.strip() and int(line.split()[0]) != face_class]
+        faces = [face for face in detector.detect_raw(image) if face['confidence'] >= min_confidence]
+        rows += [yolo_label(face_class, face['box'], width, height) for face in faces]
+        with open(label_path, 'w') as f:
+            f.write("\n".join(rows) + ("\n" if rows else ""))
+        labelled += bool(faces)
+    return labelled
+
+
+def fine_tune(data_yaml, weights=r"models\best.pt", img_size=640, frozen_epochs=20, epochs=40, batch_size=16,
+              project=os.path.join("runs", "unified"), classes=UNIFIED_CLASSES):
+    # Two stages with the yolov5 package trainer: the new head is trained on a
+    # frozen backbone (first 10 layers), then the whole network is tuned from
+    # there. `classes` (the dataset's names) are saved as classes.json next to
+    # the weights for UnifiedDetector. Returns the path of the best weights.
+    from yolov5 import train
+
+    opt = train.run(data=data_yaml, weights=weights, imgsz=img_size, epochs=frozen_epochs, batch_size=batch_size,
+                    freeze=[10], project=project, name='frozen', exist_ok=True)
+    frozen = os.path.join(opt.save_dir, 'weights', 'best.pt')
+    opt = train.run(data=data_yaml, weights=frozen, imgsz=img_size, epochs=epochs, batch_size=batch_size,
+                    project=project, name='full', exist_ok=True)
+    with open(os.path.join(opt.save_dir, 'weights', 'classes.json'), 'w') as f:
+        json.dump(classes, f)
+    return os.path.join(opt.save_dir, 'weights', 'best.pt')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the dataset for and fine-tune the unified detector")
+    commands = parser.add_subparsers(dest="command", required=True)
+    wider = commands.add_parser("widerface", help="Convert WIDER FACE annotations to YOLO labels")
+    wider.add_argument("annotations")
+    wider.add_argument("images")
+    wider.add_argument("out")
+    wider.add_argument("--split", default="train")
+    wider.add_argument("--min-size", type=int, default=20)
+    pseudo = commands.add_parser("pseudo-label", help="Add detected faces to an object dataset's labels")
+    pseudo.add_argument("images")
+    pseudo.add_argument("labels")
+    pseudo.add_argument("--min-confidence", type=float, default=0.95)
+    trainer = commands.add_parser("train", help="Write the dataset YAML and fine-tune best.pt")
+    trainer.add_argument("roots", nargs="+", help="Dataset roots with images/{train,val} and labels/{train,val}")
+    trainer.add_argument("--weights", default=r"models\best.pt")
+    trainer.add_argument("--person", action="store_true", help="Also add a `person` class (labels must exist)")
+    trainer.add_argument("--img-size", type=int, default=640)
+    trainer.add_argument("--frozen-epochs", type=int, default=20)
+    trainer.add_argument("--epochs", type=int, default=40)
+    trainer.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.command == "widerface":
+        count = convert_widerface(args.annotations, args.images, args.out, args.split, min_size=args.min_size)
+        print(f"Wrote {count} labelled images to {args.out}")
+    elif args.command == "pseudo-label":
+        count = pseudo_label_faces(args.images, args.labels, min_confidence=args.min_confidence)
+        print(f"Added face labels to {count} images")
+    else:
+        classes = UNIFIED_CLASSES + (['person'] if args.person else [])
+        data_yaml = write_dataset_yaml(os.path.join(args.roots[0], 'unified.yaml'), args.roots, classes)
+        weights = fine_tune(data_yaml, args.weights, args.img_size, args.frozen_epochs, args.epochs, args.batch_size,
+                            classes=classes)
+        print(f"Fine-tuned weights: {weights}")
+        print(f"Run with CHEATSHIELD_UNIFIED_WEIGHTS={weights}")
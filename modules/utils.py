@@ -1,5 +1,153 @@
-def log_violation(message):
-    print(f"[VIOLATION] {message}")
-    # Optionally, write to a log file
-    with open("violations.log", "a") as f:
-        f.write(f"{message}\n")
\ No newline at end of file
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Debug prints from the detectors (per-detection lines, audio statistics, ...).
+# Set CHEATSHIELD_DEBUG=0 or call set_debug(False) to turn them off entirely.
+DEBUG = os.environ.get("CHEATSHIELD_DEBUG", "1") != "0"
+
+
+def set_debug(enabled):
+    global DEBUG
+    DEBUG = enabled
+
+
+def debug(message):
+    if DEBUG:
+        print(message)
+
+
+def to_json(value):
+    # NumPy scalars and arrays (confidences, boxes) serialise as plain numbers/lists
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class ViolationLogger:
+    # Asynchronous structured violation log. Callers only enqueue a record; a
+    # background writer thread appends records as JSON lines in batches, fsyncs
+    # at most once per `fsync_interval` seconds and rotates the file when it
+    # grows past `max_bytes` (violations.jsonl -> violations.jsonl.1 -> ...).
+    # When the bounded queue is full new records are dropped and counted rather
+    # than blocking the GUI or audio thread. The file is opened here, so an
+    # unwritable log raises to the caller; if writing fails later the error is
+    # reported once and further records are dropped and counted.
+    def __init__(self, path=os.path.join("logs", "violations.jsonl"), session_id=None, max_bytes=10 * 1024 * 1024,
+                 backups=5, queue_size=10000, batch_size=256, fsync_interval=1.0):
+        self.path = path
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.failed = False
+        self.file = None
+        self.open()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def log(self, detector, message, confidence=None, boxes=None, **extra):
+        record = {
+            "timestamp": time.time(),
+            "session_id": self.session_id,
+            "detector": detector,
+            "message": message,
+            "confidence": confidence,
+            "boxes": boxes,
+        }
+        record.update(extra)
+        if self.failed:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.open()
+
+    def run(self):
+        last_sync = time.monotonic()
+        pending_sync = False
+        stopping = False
+        while not stopping:
+            # Block for the first record, then drain whatever else is queued
+            try:
+                batch = [self.queue.get(timeout=self.fsync_interval)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+
+            if batch and self.failed:
+                self.dropped += len(batch)
+            elif batch:
+                try:
+                    data = "".join(json.dumps(record, default=to_json) + "\n" for record in batch)
+                    if self.file.tell() + len(data) > self.max_bytes and self.file.tell() > 0:
+                        self.rotate()
+                    self.file.write(data)
+                    self.file.flush()
+                    self.written += len(batch)
+                    pending_sync = True
+                except (OSError, ValueError) as e:  # ValueError: file closed by a failed rotation
+                    print(f"Error writing violation log {self.path}: {e}; further records are dropped")
+                    self.failed = True
+                    self.dropped += len(batch)
+                    pending_sync = False
+
+            now = time.monotonic()
+            if pending_sync and (stopping or now - last_sync >= self.fsync_interval):
+                os.fsync(self.file.fileno())
+                last_sync = now
+                pending_sync = False
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+
+    def close(self, timeout=5.0):
+        # Flush everything already queued, then stop the writer
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+default_logger = None
+
+
+def get_logger():
+    global default_logger
+    if default_logger is None:
+        default_logger = ViolationLogger()
+    return default_logger
+
+
+def log_violation(message, detector="system", **fields):
+    debug(f"[VIOLATION] {message}")
+    get_logger().log(detector, message, **fields)
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+def normalize_level(audio, target_rms=0.05, max_gain=10.0, peak=0.99):
+    # Bring quiet speech up towards a typical level without the old peak
+    # normalization's unbounded gain: at most `max_gain`, and never past `peak`
+    rms = float(np.sqrt(np.mean(np.square(audio)))) if len(audio) else 0.0
+    if rms <= 0.0:
+        return audio
+    gain = min(max_gain, target_rms / rms, peak / (float(np.max(np.abs(audio))) + 1e-7))
+    return audio * gain if gain > 1.0 else audio
+
+
+class VoiceActivityGate:
+    # Energy/zero-crossing voice activity detector in front of YAMNet. Audio is
+    # split into short frames; a frame is active when its RMS is `energy_ratio`
+    # times above the tracked noise floor and its zero-crossing rate is in the
+    # range of voiced or whispered sound (hiss and hum fall outside it). A
+    # window is sent to the model only if it holds at least `min_active_frames`
+    # active frames. The floor follows the inactive frames, dropping at once
+    # when the room gets quieter and rising slowly when it gets louder.
+    def __init__(self, sample_rate=16000, frame_ms=30, energy_ratio=3.0, min_rms=2e-4, zcr_range=(0.01, 0.5),
+                 min_active_frames=3, floor_adapt=0.05):
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.energy_ratio = energy_ratio
+        self.min_rms = min_rms  # Absolute floor: digital silence is never active
+        self.zcr_range = zcr_range
+        self.min_active_frames = min_active_frames
+        self.floor_adapt = floor_adapt
+        self.noise_floor = None
+        self.checked = 0
+        self.skipped = 0
+
+    def frame_activity(self, audio):
+        # Per-frame activity flags for a span (trailing partial frame ignored)
+        count = len(audio) // self.frame_size
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+        frames = np.asarray(audio[:count * self.frame_size], dtype=np.float32).reshape(count, self.frame_size)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_size - 1)
+
+        if self.noise_floor is None:
+            self.noise_floor = max(float(np.percentile(rms, 10)), self.min_rms)
+        active = ((rms > self.noise_floor * self.energy_ratio) & (rms > self.min_rms) &
+                  (zcr >= self.zcr_range[0]) & (zcr <= self.zcr_range[1]))
+
+        quiet = rms[~active]
+        if len(quiet):
+            level = float(np.median(quiet))
+            if level < self.noise_floor:
+                self.noise_floor = max(level, self.min_rms)
+            else:
+                self.noise_floor += self.floor_adapt * (level - self.noise_floor)
+        return active
+
+    def active_windows(self, audio, window_size, hop_size, num_windows):
+        # Which of the `num_windows` overlapping windows in `audio` carry activity
+        active = self.frame_activity(audio)
+        counts = np.concatenate(([0], np.cumsum(active)))
+        starts = np.arange(num_windows) * hop_size // self.frame_size
+        ends = np.minimum((np.arange(num_windows) * hop_size + window_size) // self.frame_size, len(active))
+        windows = counts[ends] - counts[np.minimum(starts, ends)] >= self.min_active_frames
+        self.checked += num_windows
+        self.skipped += int(num_windows - np.count_nonzero(windows))
+        return windows
+
+    def is_active(self, audio):
+        return bool(self.active_windows(audio, len(audio), len(audio), 1)[0])
+
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def stats(self):
+        return {"checked": self.checked, "skipped": self.skipped, "skip_ratio": self.skip_ratio(),
+                "noise_floor": self.noise_floor}
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+
+
+# Warnings raised by the system controller (fullscreen exits, focus loss).
+# They are shown and logged like any other, but only count toward
+# termination with violations.count_system.
+SYSTEM_WARNINGS = ("Attempt to exit fullscreen", "Window focus lost", "Fullscreen mode exited")
+
+
+def uncounted_warnings(config):
+    # Messages of a ViolationsConfig that are shown but never counted
+    uncounted = ("Face not visible",)
+    return uncounted if config.count_system else uncounted + SYSTEM_WARNINGS
+
+
+class ViolationPolicy:
+    # Violation counting rules shared by the monitoring window and the offline
+    # replay harness: a cooldown per violation type after each accepted
+    # violation (`cooldowns` overrides the default `cooldown` for specific
+    # types), messages that are shown but never counted, and termination at
+    # `max_warnings`. Not thread-safe; ViolationEngine serialises access.
+    def __init__(self, max_warnings=10, cooldown=15, uncounted=("Face not visible",), clock=time.time,
+                 cooldowns=None):
+        self.max_warnings = max_warnings
+        self.cooldown = cooldown
+        self.cooldowns = cooldowns or {}
+        self.uncounted = uncounted
+        self.clock = clock
+        self.warning_count = 0
+        self.last_violation_time = {}  # type -> time of its last accepted violation
+
+    def submit(self, message, now=None, kind="*"):
+        # Returns None when the warning falls inside its type's cooldown,
+        # otherwise a decision dict saying whether it counted and whether the
+        # test must end
+        now = self.clock() if now is None else now
+        cooldown = self.cooldowns.get(kind, self.cooldown)
+        if now - self.last_violation_time.get(kind, float("-inf")) < cooldown:
+            return None  # Ignore the violation if within cooldown period
+
+        counted = not any(text in message for text in self.uncounted)
+        if counted:
+            self.warning_count += 1
+        self.last_violation_time[kind] = now
+        return {
+            "counted": counted,
+            "warning_count": self.warning_count,
+            "terminate": self.warning_count >= self.max_warnings,
+        }
+
+
+class ViolationEngine:
+    # GUI-free violation handling. Any thread submits events into a
+    # multi-producer queue; one engine thread applies the policy, so its state
+    # is never touched concurrently. Each accepted event is passed to
+    # `on_decision(event, decision)` on the engine thread (logging, evidence),
+    # and the resulting state changes are coalesced into at most one
+    # `on_batch(batch)` call per `batch_interval` for the UI. After the
+    # terminating violation further events are ignored.
+    def __init__(self, policy, on_batch, on_decision=None, batch_interval=0.1):
+        self.policy = policy
+        self.on_batch = on_batch
+        self.on_decision = on_decision
+        self.batch_interval = batch_interval
+        self.events = queue.SimpleQueue()
+        self.pending = []
+        self.last_flush = 0.0
+        self.terminated = False
+        self.received = 0
+        self.accepted = 0
+        self.batches = 0
+        self.thread = threading.Thread(target=self.run, name="violation-engine", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, message, detector="system", confidence=None, boxes=None, kind=None, now=None):
+        # Safe from any thread; never blocks
+        # Stamped here so time spent queued does not shift cooldowns
+        now = self.policy.clock() if now is None else now
+        self.events.put({"message": message, "detector": detector, "confidence": confidence, "boxes": boxes,
+                         "kind": kind or detector, "time": now})
+
+    def configure(self, **settings):
+        # Policy changes (e.g. max_warnings, cooldown) are queued like events
+        # and applied on the engine thread, which owns the policy
+        self.events.put({"configure": settings})
+
+    def run(self):
+        while True:
+            timeout = None
+            if self.pending:
+                timeout = max(0.0, self.last_flush + self.batch_interval - time.monotonic())
+            try:
+                event = self.events.get(timeout=timeout)
+            except queue.Empty:
+                self.flush()
+                continue
+            if event is None:
+                self.flush()
+                break
+            if "configure" in event:
+                for name, value in event["configure"].items():
+                    setattr(self.policy, name, value)
+                continue
+            self.process(event)
+            if self.pending and (self.terminated or time.monotonic() - self.last_flush >= self.batch_interval):
+                self.flush()
+
+    def process(self, event):
+        self.received += 1
+        if self.terminated:
+            return
+        decision = self.policy.submit(event["message"], now=event["time"], kind=event["kind"])
+        if decision is None:
+            return
+        self.accepted += 1
+        self.terminated = decision["terminate"]
+        if self.on_decision is not None:
+            try:
+                self.on_decision(event, decision)
+            except Exception as e:
+                print(f"Error handling violation: {e}")
+        self.pending.append({"message": event["message"], "detector": event["detector"], **decision})
+
+    def flush(self):
+        if not self.pending:
+            return
+        decisions, self.pending = self.pending, []
+        self.last_flush = time.monotonic()
+        self.batches += 1
+        self.on_batch({
+            "decisions": decisions,
+            "latest": decisions[-1]["message"],
+            "warning_count": decisions[-1]["warning_count"],
+            "max_warnings": self.policy.max_warnings,
+            "terminate": any(d["terminate"] for d in decisions),
+        })
+
+    def stop(self, timeout=1.0):
+        self.events.put(None)
+        if self.thread.is_alive():
+            self.thread.join(timeout)
@@ -0,0 +1,500 @@
+import os
+import sys
+import time
+from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit, QDialog
+from PyQt5.QtCore import Qt, QTimer, QUrl, QObject, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineSettings
+from modules.system_control import SystemController
+from modules.frame import DisplayBuffer
+from modules.utils import debug
+from modules.browser_guard import BrowserGuard
+from modules.metrics import get_metrics
+from modules.alerts import AlertPresenter
+from modules.config import load_config, ConfigError
+from modules.session import MonitoringSession, SessionError
+
+class PipelineSignals(QObject):
+    # Emitted from the session's detection worker thread; Qt queues delivery onto the GUI thread
+    detection_ready = pyqtSignal(object)
+    # Emitted from the system controller's dispatcher thread
+    refullscreen = pyqtSignal()
+    # Coalesced violation state changes from the violation engine thread
+    violation_batch = pyqtSignal(object)
+    # Reloaded configuration and the changed settings, from the config watcher thread
+    config_changed = pyqtSignal(object, object)
+
+class EndTestDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("End Test")
+        self.setModal(True)
+        layout = QVBoxLayout()
+        
+        self.password_input = QLineEdit()
+        self.password_input.setEchoMode(QLineEdit.Password)
+        layout.addWidget(QLabel("Enter Password to End Test:"))
+        layout.addWidget(self.password_input)
+        
+        self.error_label = QLabel("")
+        self.error_label.setStyleSheet("color: red;")
+        layout.addWidget(self.error_label)
+        
+        submit_button = QPushButton("Submit")
+        submit_button.clicked.connect(self.check_password)
+        layout.addWidget(submit_button)
+        
+        self.setLayout(layout)
+        # Password should be set by the user in a configuration file or environment variable
+        self.password = "SET_YOUR_PASSWORD"  # Placeholder; replace with your own password
+
+    def check_password(self):
+        entered_password = self.password_input.text()
+        if entered_password == self.password:
+            self.accept()  # Close dialog and return True
+        else:
+            self.error_label.setText("Incorrect password. Please try again.")
+
+class MonitoringWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Online Cheating Prevention - Monitoring")
+        self.setGeometry(0, 0, 300, 280)
+        
+        # Thresholds, rates and sizes (modules/config.py): defaults, the selected
+        # profile, cheatshield.json and CHEATSHIELD_* overrides
+        try:
+            self.config = load_config()
+        except ConfigError as e:
+            print(f"Error: invalid configuration: {e}")
+            sys.exit()
+        print(f"Configuration profile: {self.config.profile}")
+        
+        # Apply CSS styles to improve design (without changing position)
+        self.setStyleSheet("""
+            QMainWindow {
+                background-color: #f0f0f0;
+                border: 1px solid #ccc;
+                border-radius: 10px;
+            }
+            QLabel#webcam_label {
+                border: 2px solid #333;
+                border-radius: 5px;
+                background-color: #000;
+            }
+            QLabel#violation_label {
+                font-size: 14px;
+                color: #d32f2f;
+                font-weight: bold;
+                margin-top: 5px;
+                margin-bottom: 5px;
+            }
+            QPushButton {
+                background-color: #ff4444;
+                color: white;
+                padding: 5px;
+                font-size: 14px;
+                border: none;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #cc0000;
+            }
+        """)
+        
+        # Main widget and layout
+        main_widget = QWidget()
+        self.setCentralWidget(main_widget)
+        layout = QVBoxLayout()
+        main_widget.setLayout(layout)
+        
+        # Webcam feed
+        self.webcam_label = QLabel()
+        self.webcam_label.setObjectName("webcam_label")
+        self.webcam_label.setFixedSize(280, 180)
+        self.webcam_label.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+        layout.addWidget(self.webcam_label)
+        
+        # Optional live metrics overlay on top of the webcam feed (CHEATSHIELD_METRICS_OVERLAY=1)
+        self.metrics = get_metrics()
+        self.metrics_overlay = None
+        if os.environ.get("CHEATSHIELD_METRICS_OVERLAY", "0") == "1":
+            self.metrics_overlay = QLabel(self.webcam_label)
+            self.metrics_overlay.setGeometry(0, 0, 280, 180)
+            self.metrics_overlay.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+            self.metrics_overlay.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+            self.metrics_overlay.setStyleSheet("color: #0f0; background: rgba(0, 0, 0, 120); font-size: 9px;")
+        
+        # Violation count
+        self.violation_label = QLabel(f"Violations: 0/{self.config.violations.max_warnings}")
+        self.violation_label.setObjectName("violation_label")
+        layout.addWidget(self.violation_label)
+        
+        # End Test button
+        end_test_button = QPushButton("End Test")
+        end_test_button.clicked.connect(self.end_test)
+        layout.addWidget(end_test_button)
+        
+        # Web view for the test website (reverting to QWebEngineView)
+        self.web_view = QWebEngineView()
+        self.web_view.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint)
+        screen = QApplication.primaryScreen().size()
+        self.web_view.setGeometry(0, 0, screen.width(), screen.height())  # Fullscreen
+        # Lets the page's requestFullscreen() through and reports when it is left
+        self.web_view.settings().setAttribute(QWebEngineSettings.FullScreenSupportEnabled, True)
+        # Replace with the actual test URL or configure via environment variable
+        self.test_url = "https://example.com/"  # Placeholder; set your test URL
+        self.web_view.load(QUrl(self.test_url))
+        
+        # Inject JavaScript to enforce fullscreen and disable shortcuts/right-click
+        js_code = """
+        // Enter fullscreen mode
+        document.documentElement.requestFullscreen();
+        
+        // Disable right-click
+        document.addEventListener('contextmenu', function(e) {
+            e.preventDefault();
+        });
+        
+        // Disable keyboard shortcuts
+        document.addEventListener('keydown', function(e) {
+            // Block Windows+D (keyCode 68 is 'D')
+            if (e.key === 'd' && e.metaKey) {
+                e.preventDefault();
+            }
+            // Block F11 (exit fullscreen)
+            if (e.key === 'F11') {
+                e.preventDefault();
+            }
+            // Block Alt+Tab, Alt+F4, etc.
+            if (e.altKey) {
+                e.preventDefault();
+            }
+            // Block Ctrl+Shift+Esc (Task Manager)
+            if (e.ctrlKey && e.shiftKey && e.key === 'Escape') {
+                e.preventDefault();
+            }
+        });
+        
+        // Ensure fullscreen on focus
+        window.addEventListener('blur', function() {
+            setTimeout(() => {
+                document.documentElement.requestFullscreen();
+            }, 100);
+        });
+        """
+        self.web_view.page().runJavaScript(js_code)
+        self.web_view.show()
+        
+        # Alert overlay for warnings (reverting to QWebEngineView)
+        self.alert_view = QWebEngineView()
+        self.alert_view.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint)
+        self.alert_view.setAttribute(Qt.WA_TranslucentBackground)
+        self.alert_view.setStyleSheet("background: transparent;")  # Ensure transparency
+        self.alert_view.setFixedSize(800, 100)  # Wider to accommodate longer messages
+        self.alert_view.setGeometry(screen.width() // 2 - 400, 50, 800, 100)  # Position near the top
+        
+        # Embed the HTML content with warning display logic
+        html_content = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Violation Alert</title>
+            <style>
+                body {
+                    background: transparent !important;
+                    margin: 0;
+                    padding: 0;
+                }
+                #violation-alert {
+                    position: fixed;
+                    top: 10%;
+                    left: 50%;
+                    transform: translateX(-50%);
+                    background-color: rgba(255, 0, 0, 0.9);
+                    color: white;
+                    padding: 15px 30px;
+                    border-radius: 8px;
+                    box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
+                    z-index: 9999;
+                    font-size: 18px;
+                    font-family: Arial, sans-serif;
+                    text-align: center;
+                    max-width: 80%;
+                    word-wrap: break-word;
+                }
+                #violation-alert[hidden] {
+                    display: none;
+                }
+            </style>
+        </head>
+        <body>
+            <div id="violation-alert" hidden></div>
+            <script>
+                // The alert element is created once; updates only replace its
+                // text (never parsed as HTML) and restart the hide timer
+                const alertDiv = document.getElementById('violation-alert');
+                let hideTimer = null;
+
+                function setAlert(message) {
+                    alertDiv.textContent = message;
+                    alertDiv.hidden = false;
+
+                    // Hide the alert 10 seconds after the latest update
+                    clearTimeout(hideTimer);
+                    hideTimer = setTimeout(() => {
+                        alertDiv.hidden = true;
+                    }, 10000);
+                }
+
+                function displayAlert(message) {
+                    setAlert(message);
+                }
+            </script>
+        </body>
+        </html>
+        """
+        # Removed personal file path; use a generic base URL
+        self.alert_view.setHtml(html_content, QUrl("file://"))
+        self.alert_view.hide()
+        # Alert updates are coalesced (at most one every 0.5 s, newest message
+        # wins) and applied from the render tick
+        self.alert_presenter = AlertPresenter(lambda script: self.alert_view.page().runJavaScript(script),
+                                              self.alert_view.show, self.restack_windows,
+                                              min_interval=self.config.violations.alert_interval)
+        
+        # Capture, model loading, detection, violations, evidence and the log run
+        # in a Qt-free MonitoringSession (modules/session.py); the window renders
+        # its preview frames and turns its events into GUI-thread signals
+        self.session = MonitoringSession(self.config, display=True)
+        self.session.subscribe(self.session_event)
+        
+        # Test state
+        self.test_active = True
+        self.warning_count = 0
+        self.max_warnings = self.config.violations.max_warnings
+        self.closing = False
+        self.cleaned_up = False
+        
+        self.pipeline_signals = PipelineSignals()
+        self.pipeline_signals.detection_ready.connect(self.handle_detection)
+        self.pipeline_signals.refullscreen.connect(self.enforce_fullscreen)
+        self.pipeline_signals.violation_batch.connect(self.apply_violations)
+        self.pipeline_signals.config_changed.connect(self.apply_config)
+        
+        # Webcam, detection threads and background model loading
+        try:
+            self.session.start()
+        except SessionError as e:
+            print(f"Error: {e}")
+            sys.exit()
+        
+        # Start system controls. Key hooks and focus/fullscreen changes are
+        # handled by the controller's dispatcher thread; its warnings go to the
+        # session's violation engine and re-fullscreen comes back to the GUI
+        # thread through a signal.
+        self.system_controller = SystemController(
+            on_warning=lambda message: self.report_violation(message, "system"),
+            on_refullscreen=self.pipeline_signals.refullscreen.emit)
+        self.system_controller.start_test()
+        # Browsers open now or opened during the test are closed when it ends
+        self.browser_guard = BrowserGuard()
+        self.browser_guard.start()
+        QApplication.instance().applicationStateChanged.connect(self.application_state_changed)
+        QApplication.instance().focusWindowChanged.connect(self.focus_window_changed)
+        self.web_view.page().fullScreenRequested.connect(self.web_fullscreen_requested)
+        
+        # Latest detection boxes, overlaid on every preview frame
+        self.last_detections = None
+        self.last_faces = None
+        
+        # Preview is resized into one preallocated RGB buffer that the QImage wraps directly
+        self.display = DisplayBuffer(280, 180)
+        self.display_image = QImage(self.display.buffer.data, self.display.width, self.display.height,
+                                    3 * self.display.width, QImage.Format_RGB888)
+        
+        # Start webcam update
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_frame)
+        self.timer.start(self.config.capture.render_interval_ms)  # 10 FPS by default
+        if self.metrics_overlay is not None:
+            self.metrics_timer = QTimer()
+            self.metrics_timer.timeout.connect(self.update_metrics_overlay)
+            self.metrics_timer.start(1000)
+        
+        # Keep window on top and remove window controls
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint)
+        self.show()
+
+    def session_event(self, event):
+        # Runs on the session's threads; Qt queues each signal onto the GUI thread
+        if event["type"] == "detection":
+            self.pipeline_signals.detection_ready.emit(event["result"])
+        elif event["type"] == "violations":
+            self.pipeline_signals.violation_batch.emit(event["batch"])
+        elif event["type"] == "config":
+            self.pipeline_signals.config_changed.emit(event["config"], event["changed"])
+
+    def apply_config(self, config, changed):
+        # Runs on the GUI thread via the config_changed signal. The session has
+        # already applied the detector, pipeline and violation settings.
+        self.config = config
+        self.max_warnings = config.violations.max_warnings
+        self.violation_label.setText(f"Violations: {self.warning_count}/{self.max_warnings}")
+        self.alert_presenter.min_interval = config.violations.alert_interval
+        self.timer.setInterval(config.capture.render_interval_ms)
+
+    def update_frame(self):
+        if not self.test_active or self.closing:
+            return
+        
+        # Show the newest pending alert, if one is due
+        self.alert_presenter.tick()
+        
+        frame = self.session.display_queue.get_nowait()
+        if frame is None:
+            return
+        
+        start = time.perf_counter()
+        # Resize frame for display and draw the latest detections on top
+        scale = self.display.render(frame)
+        object_detector, face_detector = self.session.object_detector, self.session.face_detector
+        if self.last_detections is not None and object_detector is not None:
+            object_detector.draw(self.display.buffer, self.last_detections, scale, rgb=True)
+        if self.last_faces and face_detector is not None:
+            face_detector.annotate(self.display.buffer, self.last_faces, scale, rgb=True)
+        self.webcam_label.setPixmap(QPixmap.fromImage(self.display_image))
+        self.metrics.observe("stage_seconds", time.perf_counter() - start, stage="render")
+
+    def update_metrics_overlay(self):
+        self.metrics_overlay.setText("\n".join(self.metrics.overlay_lines()))
+
+    def handle_detection(self, result):
+        # Runs on the GUI thread via the detection_ready signal
+        if not self.test_active or self.closing:
+            return
+        
+        self.last_detections = result["detections"]
+        self.last_faces = result["faces"]
+
+    def report_violation(self, message, detector="system"):
+        # Safe from any thread: only enqueues for the session's violation engine
+        if self.test_active and not self.closing:
+            self.session.report_violation(message, detector)
+
+    def apply_violations(self, batch):
+        # Runs on the GUI thread via the violation_batch signal. The count is
+        # kept current even while the end-test dialog is open; a terminating
+        # batch that arrives then ends the test once the dialog is dismissed.
+        self.warning_count = batch["warning_count"]
+        self.violation_label.setText(f"Violations: {self.warning_count}/{self.max_warnings}")
+        if not self.test_active or self.closing:
+            return
+        
+        # Queue the alert; the presenter coalesces bursts into one overlay update
+        self.alert_presenter.post(batch["latest"])
+        
+        # Only end the test if the maximum warnings are reached
+        if batch["terminate"]:
+            print("Maximum warnings reached. Ending test...")
+            self.end_test(automatic=True)
+
+    def enforce_fullscreen(self):
+        if not self.test_active or self.closing:
+            return
+        self.web_view.showFullScreen()
+        self.web_view.activateWindow()
+        self.restack_windows()
+
+    def restack_windows(self):
+        # Keep the monitoring window and alert view above the test page
+        self.raise_()
+        self.alert_view.raise_()
+
+    def application_state_changed(self, state):
+        active = state == Qt.ApplicationActive
+        self.system_controller.notify_focus(active)
+        # Restack only when focus is actually lost, not on every frame
+        self.alert_presenter.focus_changed(active)
+
+    def focus_window_changed(self, window):
+        # Clicking into the exam page raises it above the other stay-on-top
+        # windows while the application stays active
+        if window is not None and window is self.web_view.windowHandle():
+            self.alert_presenter.covered()
+
+    def web_fullscreen_requested(self, request):
+        # The test page entering or leaving HTML fullscreen (e.g. Esc)
+        request.accept()
+        self.system_controller.notify_fullscreen(request.toggleOn())
+
+    def focusInEvent(self, event):
+        # Re-raise the window when it gains focus
+        self.restack_windows()
+        super().focusInEvent(event)
+
+    def end_test(self, automatic=False):
+        if self.closing:
+            return
+        
+        self.closing = True
+        self.test_active = False
+        
+        if automatic:
+            self.cleanup()
+            self.close_application()
+            return
+        
+        # No new violations are submitted while the proctor decides
+        self.session.pause()
+        dialog = EndTestDialog(self)
+        if dialog.exec_():
+            self.cleanup()
+            self.close_application()
+        else:
+            self.closing = False
+            self.test_active = True
+            self.session.resume()
+            self.timer.start(self.config.capture.render_interval_ms)
+            if self.session.terminated:
+                # The warning limit was reached just before or while the dialog was open
+                print("Maximum warnings reached. Ending test...")
+                self.end_test(automatic=True)
+
+    def cleanup(self):
+        # end_test() and closeEvent() can both get here; tear down only once
+        if self.cleaned_up:
+            return
+        self.cleaned_up = True
+        self.timer.stop()
+        if self.metrics_overlay is not None:
+            self.metrics_timer.stop()
+        self.system_controller.stop_test()
+        self.session.close()
+        debug(f"Enforcement actions: {self.system_controller.stats()}")
+        debug(f"Alert overlay: {self.alert_presenter.stats()}")
+        self.alert_view.hide()
+        self.web_view.hide()
+        self.close_browser()
+
+    def close_browser(self):
+        stats = self.browser_guard.terminate(timeout=3.0)
+        debug(f"Closed {stats['targeted']} browser process(es) ({stats['killed']} killed, "
+              f"{stats['survived']} survived) in {stats['seconds'] * 1000:.0f} ms; "
+              f"{stats['processes_scanned']} processes scanned during the test")
+
+    def close_application(self):
+        QApplication.quit()
+
+    def closeEvent(self, event):
+        if self.test_active and not self.closing:
+            event.ignore()
+            self.end_test()
+        else:
+            self.cleanup()
+            event.accept()
+
+def run():
+    app = QApplication(sys.argv)
+    window = MonitoringWindow()
+    return app.exec_()